@@ -1,79 +1,77 @@
 from flask import Flask
-from config import Config
+import os
+import weakref
+from config import config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-import logging
-from logging.handlers import SMTPHandler, RotatingFileHandler
-import os
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-login = LoginManager(app)
-login.login_view = 'login'
+# the extensions are bound by create_app, importing the package builds no app, engine or log handler
+db = SQLAlchemy()
+migrate = Migrate()
+login = LoginManager()
+login.login_view = 'main.login'
+# the JSON API answers 401 instead of redirecting to the login page
+login.blueprint_login_views = {'api': None}
 
-if not app.debug:
-    if app.config['MAIL_SERVER']:
-        auth = None
-        if app.config['MAIL_USERNAME'] or app.config['MAIL_PASSWORD']:
-            auth = (app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
-        secure = None
-        if app.config['MAIL_USE_TLS']:
-            secure = ()
-        mail_handler = SMTPHandler(
-            mailhost=(app.config['MAIL_SERVER'], app.config['MAIL_PORT']),
-            fromaddr='no-reply@' + app.config['MAIL_SERVER'],
-            toaddrs=app.config['ADMINS'], subject='GidGud Failure',
-            credentials=auth, secure=secure)
-        mail_handler.setLevel(logging.ERROR)
-        app.logger.addHandler(mail_handler)
+# the apps built in this process, reset in a forked child. Weak, so apps built by tests and benchmarks can be freed
+_apps = weakref.WeakSet()
 
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-        file_handler = RotatingFileHandler('logs/gidgud.log', maxBytes=10240, backupCount=10)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+def create_app(config_class=None) -> Flask:
+    """
+    Create the application, bind the extensions and register the blueprints.
 
-        app.logger.setLevel(logging.INFO)
-        app.logger.info('GidGud startup')
+    Args:
+        config_class: The configuration, defaults to the one named by GIDGUD_CONFIG.
 
-if app.debug:
+    Returns:
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class or config[os.environ.get('GIDGUD_CONFIG') or 'default'])
 
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-        file_handler = RotatingFileHandler('logs/gidgud.log', maxBytes=10240, backupCount=10)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    login.init_app(app)
 
-        # sql logging
-        #logging.basicConfig()
-        #logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
-        #logging.getLogger('sqlalchemy.engine').addHandler(logging.StreamHandler())
-        # end
+    from app.sqlite_profile import sqlite_profile_init_app
+    sqlite_profile_init_app(app)
 
-        app.logger.setLevel(logging.INFO)
+    # instrumentation first, so its before_request hook also times the user load in the routes' hook
+    from app.instrumentation import instrumentation_init_app
+    from app.query_budget import query_budget_init_app
+    instrumentation_init_app(app)
+    query_budget_init_app(app)
+
+    from app.routes import bp as main_bp
+    from app.errors import bp as errors_bp
+    from app.cli import bp as cli_bp
+    from app.api import bp as api_bp
+    app.register_blueprint(main_bp)
+    app.register_blueprint(errors_bp)
+    app.register_blueprint(cli_bp)
+    app.register_blueprint(api_bp)
+
+    # tests and benchmarks get no log files and no listener thread
+    if not app.testing:
+        from app.logging_pipeline import logging_configure
+        logging_configure(app)
         app.logger.info('GidGud startup')
 
-    else:
-        file_handler = RotatingFileHandler('logs/gidgud.log', maxBytes=10240, backupCount=10)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+    _apps.add(app)
+    return app
 
-        # sql logging
-        #logging.basicConfig()
-        #logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
-        #logging.getLogger('sqlalchemy.engine').addHandler(logging.StreamHandler())
-        # end
+def _reset_after_fork():
+    # a worker forked from a preloading parent must not reuse its pooled connections, and the logging thread
+    # isn't copied by fork. The last_seen and scheduler threads start on the worker's first request anyway
+    from app.logging_pipeline import logging_restart
+    for app in list(_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+        logging_restart(app)
 
-        app.logger.setLevel(logging.INFO)
-        app.logger.info('GidGud startup')
+os.register_at_fork(after_in_child=_reset_after_fork)
 
-from app import routes, models, errors
\ No newline at end of file
+# user_cache registers the listeners that invalidate cached users on change
+from app import models, user_cache
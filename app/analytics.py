@@ -0,0 +1,170 @@
+# analytics.py
+
+from datetime import date, datetime
+import numpy as np
+from app.models import CompletionDaily
+from app import db
+import sqlalchemy as sa
+from pytz import utc
+
+# Completion analytics
+# completions are reduced to integer day numbers (days since 1970-01-01, UTC) and evaluated with vectorized
+# numpy operations, no per-row python loops
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+HEATMAP_WEEKS = 52
+
+def analytics_day_number(day: date) -> int:
+    """Return the number of days between 1970-01-01 and the given date."""
+    return day.toordinal() - EPOCH_ORDINAL
+
+def analytics_weekday(days: np.ndarray) -> np.ndarray:
+    """Return the weekday (Monday = 0) of each day number, 1970-01-01 was a Thursday."""
+    return (days + 3) % 7
+
+def analytics_days_from_timestamps(timestamps: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce completion timestamps to the days they fall on.
+
+    Args:
+        timestamps (np.ndarray): Completion times as integer seconds since the epoch (UTC), in any order.
+
+    Returns:
+        tuple: Sorted unique day numbers and the number of completions on each of them.
+    """
+    if timestamps.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    days = timestamps // SECONDS_PER_DAY
+    first = days.min()
+    per_day = np.bincount(days - first)
+    active = np.flatnonzero(per_day)
+    return active + first, per_day[active]
+
+def analytics_streaks(days: np.ndarray, today: int) -> dict:
+    """
+    Compute the current and the longest run of consecutive days with completions.
+
+    The current streak is still alive if the last completion was today or yesterday.
+
+    Args:
+        days (np.ndarray): Sorted unique day numbers with at least one completion.
+        today (int): The day number of today.
+
+    Returns:
+        dict: 'current' and 'longest' streak length in days.
+    """
+    if days.size == 0:
+        return {'current': 0, 'longest': 0}
+    # a run starts wherever the gap to the previous day is not exactly one
+    starts = np.flatnonzero(np.diff(days, prepend=days[0] - 2) != 1)
+    lengths = np.diff(starts, append=days.size)
+    current = int(lengths[-1]) if days[-1] >= today - 1 else 0
+    return {'current': current, 'longest': int(lengths.max())}
+
+def analytics_heatmap(days: np.ndarray, counts: np.ndarray, today: int, weeks: int = HEATMAP_WEEKS) -> np.ndarray:
+    """
+    Count completions per day of the last weeks as a weekday x week grid.
+
+    Args:
+        days (np.ndarray): Sorted unique day numbers with at least one completion.
+        counts (np.ndarray): Completions on each of these days.
+        today (int): The day number of today, its week is the last column.
+        weeks (int): The number of weeks, defaults to 52.
+
+    Returns:
+        np.ndarray: Array of shape (7, weeks), rows are weekdays starting with Monday, columns are weeks, oldest first.
+    """
+    start = today - analytics_weekday(today) - 7 * (weeks - 1)
+    visible = (days >= start) & (days <= today)
+    grid = np.bincount(days[visible] - start, weights=counts[visible], minlength=7 * weeks)
+    return grid.astype(np.int64).reshape(weeks, 7).T
+
+def analytics_weekday_distribution(days: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Count completions per weekday.
+
+    Args:
+        days (np.ndarray): Day numbers with at least one completion.
+        counts (np.ndarray): Completions on each of these days.
+
+    Returns:
+        np.ndarray: Seven counts, Monday first.
+    """
+    return np.bincount(analytics_weekday(days), weights=counts, minlength=7).astype(np.int64)
+
+def analytics_rolling_totals(days: np.ndarray, counts: np.ndarray, today: int, window: int, span: int) -> np.ndarray:
+    """
+    Compute the number of completions in a sliding window for each of the last days.
+
+    Args:
+        days (np.ndarray): Sorted unique day numbers with at least one completion.
+        counts (np.ndarray): Completions on each of these days.
+        today (int): The day number of today, the last value ends on it.
+        window (int): The window length in days.
+        span (int): The number of days for which the window total is returned.
+
+    Returns:
+        np.ndarray: span window totals, the last one covers the window ending today.
+    """
+    start = today - span - window + 1
+    visible = (days >= start) & (days <= today)
+    daily = np.bincount(days[visible] - start, weights=counts[visible], minlength=span + window)
+    cumulative = np.cumsum(daily)
+    return (cumulative[window:] - cumulative[:-window]).astype(np.int64)
+
+def analytics_summary(days: np.ndarray, counts: np.ndarray, today: int) -> dict:
+    """
+    Compute streaks, heatmap, weekday distribution and recent totals from per day completion counts.
+
+    Args:
+        days (np.ndarray): Sorted unique day numbers with at least one completion.
+        counts (np.ndarray): Completions on each of these days.
+        today (int): The day number of today.
+
+    Returns:
+        dict: 'streaks', 'heatmap' (7 rows of week counts), 'weekdays', 'last_7_days' and 'last_30_days'.
+    """
+    return {
+        'streaks': analytics_streaks(days, today),
+        'heatmap': analytics_heatmap(days, counts, today).tolist(),
+        'weekdays': dict(zip(WEEKDAYS, analytics_weekday_distribution(days, counts).tolist())),
+        'last_7_days': int(analytics_rolling_totals(days, counts, today, 7, 1)[-1]),
+        'last_30_days': int(analytics_rolling_totals(days, counts, today, 30, 1)[-1]),
+    }
+
+def analytics_load_days(user_id: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Load the completions per day of a user from the daily rollup.
+
+    Args:
+        user_id (int): The ID of the user whose completions are loaded.
+
+    Returns:
+        tuple: Sorted unique day numbers and the number of completions on each of them.
+    """
+    rows = db.session.execute(
+        sa.select(CompletionDaily.day, sa.func.sum(CompletionDaily.count))
+        .where(CompletionDaily.user_id == user_id)
+        .group_by(CompletionDaily.day)
+        .order_by(CompletionDaily.day)
+    ).all()
+    days = np.fromiter((analytics_day_number(day) for day, _ in rows), dtype=np.int64, count=len(rows))
+    counts = np.fromiter((count for _, count in rows), dtype=np.int64, count=len(rows))
+    return days, counts
+
+def analytics_return_summary(user_id: int, now: datetime | None = None) -> dict:
+    """
+    Return the completion analytics of a user for the statistics page.
+
+    Args:
+        user_id (int): The ID of the user whose completions are evaluated.
+        now (datetime, optional): The current time, defaults to now.
+
+    Returns:
+        dict: See analytics_summary.
+    """
+    now = now or datetime.now(utc)
+    days, counts = analytics_load_days(user_id)
+    return analytics_summary(days, counts, analytics_day_number(now.astimezone(utc).date()))
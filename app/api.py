@@ -0,0 +1,69 @@
+# api.py
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user, login_required
+from werkzeug.exceptions import HTTPException
+from app import db
+from app.bulk import bulk_complete_gidguds, bulk_create_gidguds, bulk_delete_gidguds
+from app.query_budget import query_budget
+from app.utils import log_exception
+
+# JSON batch API
+# authenticated by the login session like the HTML routes. Only application/json bodies are accepted,
+# which a cross-site form can't send, so the endpoints need no CSRF token
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+def api_return_batch(key: str) -> list:
+    """Return the list under key of the JSON body, aborting with 400, 413 or 415 if it isn't usable."""
+    if not request.is_json:
+        abort(415, 'Send the batch as application/json.')
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get(key), list):
+        abort(400, f'Expected an object with a list "{key}".')
+    batch = payload[key]
+    if len(batch) > current_app.config['BULK_MAX_ITEMS']:
+        abort(413, f'At most {current_app.config["BULK_MAX_ITEMS"]} items per batch.')
+    return batch
+
+def api_run_batch(operation, batch: list):
+    try:
+        results = operation(current_user.id, batch)
+    except Exception as e:
+        db.session.rollback()
+        log_exception(e)
+        abort(500, 'The batch failed, nothing was saved.')
+    return jsonify({
+        'results': results,
+        'succeeded': sum(1 for result in results if result['ok']),
+        'failed': sum(1 for result in results if not result['ok']),
+    })
+
+@bp.route('/gidguds/batch/create', methods=['POST'])
+@login_required
+@query_budget(12, safe=False)
+def batch_create_gidguds():
+    """
+    Create many gidguds: {"items": [{"body": "...", "category": "...", "recurrence_rhythm": 0, "time_unit": null, "completed": false}]}
+    """
+    return api_run_batch(bulk_create_gidguds, api_return_batch('items'))
+
+@bp.route('/gidguds/batch/complete', methods=['POST'])
+@login_required
+@query_budget(10, safe=False)
+def batch_complete_gidguds():
+    """Complete many gidguds: {"ids": [1, 2, 3]}"""
+    return api_run_batch(bulk_complete_gidguds, api_return_batch('ids'))
+
+@bp.route('/gidguds/batch/delete', methods=['POST'])
+@login_required
+@query_budget(10, safe=False)
+def batch_delete_gidguds():
+    """Delete many gidguds with their completion history: {"ids": [1, 2, 3]}"""
+    return api_run_batch(bulk_delete_gidguds, api_return_batch('ids'))
+
+# the app wide 500 handler of the errors blueprint renders HTML and is looked up before an HTTPException handler
+@bp.errorhandler(HTTPException)
+@bp.errorhandler(500)
+def api_error(error):
+    return jsonify({'error': error.name, 'message': error.description}), error.code
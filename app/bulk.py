@@ -0,0 +1,228 @@
+# bulk.py
+
+from datetime import datetime, timedelta
+from app.models import GidGud, Category, Completion, user_bump_data_version
+from app import db
+from app.category_counters import category_counters_refresh
+from app.rollup import rollup_add_completions, rollup_refresh
+from app.scheduler import recurrence_scheduler
+import sqlalchemy as sa
+from pytz import utc
+
+# Batch operations on gidguds
+# a batch is checked item by item, the valid items are written with one executemany statement per table,
+# counters, rollup and data version are brought up to date once and everything is committed together.
+# Every function returns one result per item, in input order: {'index', 'ok', 'id'} or {'index', 'ok', 'error'}
+
+TIME_UNITS = GidGud.__table__.c.time_unit.type.enums
+
+def bulk_result(index: int, id: int | None = None, error: str | None = None) -> dict:
+    if error is not None:
+        return {'index': index, 'ok': False, 'error': error}
+    return {'index': index, 'ok': True, 'id': id}
+
+def bulk_return_ids(ids: list) -> set[int]:
+    """Return the integers in ids, bools and other JSON values never match a gidgud."""
+    return {id for id in ids if isinstance(id, int) and not isinstance(id, bool)}
+
+def bulk_check_create_item(item) -> str | None:
+    """Return why a create item is invalid, None if it is valid. Mirrors CreateGidForm."""
+    if not isinstance(item, dict):
+        return 'item must be an object'
+    body = item.get('body')
+    if not isinstance(body, str) or not 1 <= len(body) <= 140:
+        return 'body must be a string of 1 to 140 characters'
+    category = item.get('category')
+    if category is not None and (not isinstance(category, str) or len(category) > 20):
+        return 'category must be a string of at most 20 characters'
+    rhythm = item.get('recurrence_rhythm', 0)
+    if not isinstance(rhythm, int) or isinstance(rhythm, bool) or rhythm < 0:
+        return 'recurrence_rhythm must be an integer >= 0'
+    time_unit = item.get('time_unit')
+    if rhythm and time_unit not in TIME_UNITS:
+        return f'time_unit must be one of {", ".join(TIME_UNITS)} for recurring gids'
+    if not rhythm and time_unit:
+        return 'time_unit requires a recurrence_rhythm'
+    if rhythm and item.get('completed'):
+        return 'recurring gids can not be created completed'
+    return None
+
+def bulk_return_categories(user_id: int, names: set[str]) -> dict:
+    """
+    Return the IDs of the named categories of a user, inserting the missing ones.
+
+    One query finds the existing categories, the missing ones are inserted with one executemany and
+    get their top level path with one UPDATE, the ORM path listener would run once per category.
+
+    Returns:
+        dict: name -> category ID
+    """
+    categories = dict(db.session.execute(
+        sa.select(Category.name, Category.id).where((Category.user_id == user_id) & Category.name.in_(names))
+    ).all())
+    missing = sorted(names - categories.keys())
+    if missing:
+        inserted = db.session.execute(
+            sa.insert(Category).returning(Category.name, Category.id),
+            [{'name': name, 'user_id': user_id} for name in missing]
+        ).all()
+        categories.update(dict(inserted))
+        db.session.execute(
+            sa.update(Category)
+            .where(Category.id.in_([id for name, id in inserted]))
+            .values(path='/' + sa.cast(Category.id, sa.String) + '/', depth=0),
+            execution_options={'synchronize_session': False}
+        )
+    return categories
+
+def bulk_create_gidguds(user_id: int, items: list) -> list[dict]:
+    """
+    Create gids, recurring gids and (with 'completed': true) guds for a user and commit them.
+
+    Args:
+        user_id (int): The owner of the new gidguds.
+        items (list): Objects with body, and optionally category, recurrence_rhythm, time_unit and completed.
+
+    Returns:
+        list[dict]: The result of every item, with the ID of the created gidgud.
+    """
+    results = [bulk_result(index, error=bulk_check_create_item(item)) for index, item in enumerate(items)]
+    valid = [(result['index'], items[result['index']]) for result in results if result['ok']]
+    if not valid:
+        return results
+
+    categories = bulk_return_categories(user_id, {item.get('category') or 'default' for index, item in valid})
+    timestamp = datetime.now(utc)
+    # every row gets its own timestamp, one microsecond apart in input order, which identifies it among the
+    # returned rows: RETURNING guarantees no order and sort_by_parameter_order falls back to one INSERT per row
+    # on SQLite. The batch also keeps its input order in the feed
+    rows = [{
+        'body': item['body'],
+        'timestamp': timestamp + timedelta(microseconds=position),
+        'user_id': user_id,
+        'category_id': categories[item.get('category') or 'default'],
+        'recurrence_rhythm': item.get('recurrence_rhythm', 0),
+        'time_unit': item.get('time_unit') or None,
+        'completed': timestamp + timedelta(microseconds=position) if item.get('completed') else None,
+    } for position, (index, item) in enumerate(valid)]
+    # render_nulls keeps all rows in one parameter set
+    ids_by_timestamp = dict(db.session.execute(
+        sa.insert(GidGud).returning(GidGud.timestamp, GidGud.id), rows, execution_options={'render_nulls': True}
+    ).all())
+    ids = [ids_by_timestamp[row['timestamp']] for row in rows]
+
+    # guds get their completion like create_gud
+    completions = [
+        {'gidgud_id': id, 'completed_at': row['completed'], 'amount': 1, 'user_id': user_id, 'category_id': row['category_id'], 'times': 1}
+        for id, row in zip(ids, rows) if row['completed'] is not None
+    ]
+    if completions:
+        db.session.execute(sa.insert(Completion), [
+            {'gidgud_id': c['gidgud_id'], 'completed_at': c['completed_at'], 'amount': c['amount']} for c in completions
+        ])
+        rollup_add_completions(completions)
+
+    # the bulk insert bypasses the mapper events maintaining the counters
+    category_counters_refresh(list(categories.values()))
+    user_bump_data_version(user_id)
+    db.session.commit()
+
+    for (index, item), id in zip(valid, ids):
+        results[index] = bulk_result(index, id)
+    return results
+
+def bulk_complete_gidguds(user_id: int, ids: list) -> list[dict]:
+    """
+    Complete gidguds of a user and commit. One-off gids become guds, recurring gids sleep until their next occurrence.
+
+    Every gidgud is completed at most once per batch, a repeated ID fails with 'already completed' like a gud.
+
+    Args:
+        user_id (int): The owner of the gidguds.
+        ids (list): The IDs of the gidguds to complete.
+
+    Returns:
+        list[dict]: The result of every ID.
+    """
+    found = {
+        row.id: row for row in db.session.execute(
+            sa.select(GidGud.id, GidGud.category_id, GidGud.recurrence_rhythm, GidGud.time_unit,
+                      GidGud.amount, GidGud.times, GidGud.completed)
+            .where((GidGud.user_id == user_id) & GidGud.id.in_(bulk_return_ids(ids)))
+        )
+    }
+    timestamp = datetime.now(utc)
+    results, completions, completed, woken = [], [], {}, {}
+    for index, id in enumerate(ids):
+        gidgud = found.get(id) if isinstance(id, int) and not isinstance(id, bool) else None
+        if gidgud is None:
+            results.append(bulk_result(index, error='not found'))
+            continue
+        if gidgud.completed is not None or id in completed or id in woken:
+            results.append(bulk_result(index, error='already completed'))
+            continue
+        if gidgud.recurrence_rhythm == 0:
+            completed[id] = timestamp
+        else:
+            try:
+                woken[id] = timestamp + timedelta(**{gidgud.time_unit: gidgud.recurrence_rhythm})
+            except TypeError:
+                results.append(bulk_result(index, error=f'can not schedule the time unit {gidgud.time_unit}'))
+                continue
+        completions.append({'gidgud_id': id, 'completed_at': timestamp, 'amount': gidgud.amount,
+                            'user_id': user_id, 'category_id': gidgud.category_id, 'times': gidgud.times})
+        results.append(bulk_result(index, id))
+    if not completions:
+        return results
+
+    db.session.execute(sa.insert(Completion), [
+        {'gidgud_id': c['gidgud_id'], 'completed_at': c['completed_at'], 'amount': c['amount']} for c in completions
+    ])
+    # executemany UPDATEs by primary key, one per changed column
+    if completed:
+        db.session.execute(sa.update(GidGud), [{'id': id, 'completed': at} for id, at in completed.items()])
+    if woken:
+        db.session.execute(sa.update(GidGud), [{'id': id, 'next_occurrence': at} for id, at in woken.items()])
+    rollup_add_completions(completions)
+    category_counters_refresh({c['category_id'] for c in completions})
+    user_bump_data_version(user_id)
+    db.session.commit()
+
+    for id, next_occurrence in woken.items():
+        recurrence_scheduler.schedule(id, next_occurrence)
+    return results
+
+def bulk_delete_gidguds(user_id: int, ids: list) -> list[dict]:
+    """
+    Delete gidguds of a user with their completion history and commit.
+
+    Args:
+        user_id (int): The owner of the gidguds.
+        ids (list): The IDs of the gidguds to delete.
+
+    Returns:
+        list[dict]: The result of every ID.
+    """
+    found = dict(db.session.execute(
+        sa.select(GidGud.id, GidGud.category_id)
+        .where((GidGud.user_id == user_id) & GidGud.id.in_(bulk_return_ids(ids)))
+    ).all())
+    results, deleted = [], set()
+    for index, id in enumerate(ids):
+        if not isinstance(id, int) or isinstance(id, bool) or id not in found or id in deleted:
+            results.append(bulk_result(index, error='not found'))
+            continue
+        deleted.add(id)
+        results.append(bulk_result(index, id))
+    if not deleted:
+        return results
+
+    # the history goes with the gidguds, SQLite doesn't enforce the ON DELETE CASCADE by default
+    db.session.execute(sa.delete(Completion).where(Completion.gidgud_id.in_(deleted)))
+    db.session.execute(sa.delete(GidGud).where(GidGud.id.in_(deleted)), execution_options={'synchronize_session': False})
+    category_ids = list({found[id] for id in deleted})
+    category_counters_refresh(category_ids)
+    rollup_refresh(category_ids)
+    user_bump_data_version(user_id)
+    db.session.commit()
+    return results
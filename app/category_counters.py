@@ -0,0 +1,62 @@
+# category_counters.py
+
+from app.models import GidGud, Category
+from app import db
+import sqlalchemy as sa
+
+# Category counters
+# open/sleeping/completed/total gidgud counts are stored on Category and shifted by the GidGud mapper events,
+# statements that bypass the ORM recompute them here
+
+# counter column -> predicate on GidGud, mirrors gidgud_counter_column in models.py
+CATEGORY_COUNTERS = {
+    'open_count': GidGud.completed.is_(None) & GidGud.next_occurrence.is_(None),
+    'sleeping_count': GidGud.completed.is_(None) & GidGud.next_occurrence.isnot(None),
+    'completed_count': GidGud.completed.isnot(None),
+    'gidgud_count': sa.true(),
+}
+
+def category_counters_select() -> dict:
+    """
+    Return a correlated count subquery per counter column, counting the gidguds of the enclosing Category.
+
+    Returns:
+        dict: counter column -> scalar subquery
+    """
+    return {
+        column: (
+            sa.select(sa.func.count(GidGud.id))
+            .where((GidGud.category_id == Category.id) & predicate)
+            .scalar_subquery()
+        )
+        for column, predicate in CATEGORY_COUNTERS.items()
+    }
+
+def category_counters_refresh(category_ids: list[int] | None = None) -> int:
+    """
+    Recompute the counters of the given categories from their gidguds in one UPDATE. Does not commit.
+
+    Args:
+        category_ids (list[int], optional): The categories to recompute, defaults to all.
+
+    Returns:
+        int: The number of categories updated.
+    """
+    update = sa.update(Category).values(category_counters_select())
+    if category_ids is not None:
+        update = update.where(Category.id.in_(set(category_ids)))
+    return db.session.execute(update, execution_options={'synchronize_session': False}).rowcount
+
+def check_and_return_inconsistent_counters() -> list:
+    """
+    Return the categories whose stored counters differ from the counted gidguds.
+
+    Returns:
+        list: Rows of (id, name, stored counters..., counted counters...) with the counted values labelled 'actual_<column>'.
+    """
+    actual = {column: subquery.label(f'actual_{column}') for column, subquery in category_counters_select().items()}
+    stored = [getattr(Category, column) for column in CATEGORY_COUNTERS]
+    mismatch = sa.or_(*(getattr(Category, column) != actual[column] for column in CATEGORY_COUNTERS))
+    return db.session.execute(
+        sa.select(Category.id, Category.name, *stored, *actual.values()).where(mismatch).order_by(Category.id)
+    ).all()
@@ -0,0 +1,136 @@
+# category_tree.py
+
+from flask import g
+from app.models import Category
+from app import db
+import sqlalchemy as sa
+
+# Category tree
+# the whole category forest of a user is loaded with one query and linked in memory,
+# so templates and helpers never walk parent/children relationships lazily
+
+MAX_CATEGORY_DEPTH = 2  # three levels: 0 = top level, 1 = child, 2 = grandchild
+
+class CategoryNode:
+    """
+    A category with its position in the tree.
+
+    Attributes:
+        category (Category): The category itself.
+        parent (CategoryNode): The parent node, None for top level categories.
+        children (list[CategoryNode]): The child nodes, ordered by name.
+        depth (int): 0 for top level categories, 1 for children, 2 for grandchildren.
+        height (int): Number of levels below this category, 0 for leaves.
+        size (int): Number of categories in the subtree, including this one.
+        subtree_gidgud_count (int): Number of gidguds in the subtree, including this category's own.
+    """
+
+    def __init__(self, category):
+        self.category = category
+        self.parent = None
+        self.children = []
+        self.depth = 0
+        self.height = 0
+        self.size = 1
+        self.subtree_gidgud_count = 0
+
+    @property
+    def id(self):
+        return self.category.id
+
+    @property
+    def name(self):
+        return self.category.name
+
+    def walk(self):
+        """Yield this node and all of its descendants depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def __repr__(self):
+        return '<CategoryNode {} depth={}>'.format(self.name, self.depth)
+
+class CategoryTree:
+    """
+    In-memory adjacency structure of a user's categories.
+
+    Attributes:
+        roots (list[CategoryNode]): The top level categories, ordered by name.
+        nodes (dict): category id -> CategoryNode
+        names (dict): category name -> CategoryNode, names are unique per user
+    """
+
+    def __init__(self, categories):
+        self.nodes = {category.id: CategoryNode(category) for category in categories}
+        self.names = {node.name: node for node in self.nodes.values()}
+        self.roots = []
+
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.category.parent_id)
+            if parent is None:
+                self.roots.append(node)
+            else:
+                node.parent = parent
+                parent.children.append(node)
+
+        for root in self.roots:
+            self._measure(root, 0)
+
+    def _measure(self, node, depth):
+        node.depth = depth
+        for child in node.children:
+            self._measure(child, depth + 1)
+        node.height = 1 + max((child.height for child in node.children), default=-1)
+        node.size = 1 + sum(child.size for child in node.children)
+        node.subtree_gidgud_count = node.category.gidgud_count + sum(child.subtree_gidgud_count for child in node.children)
+
+    @property
+    def categories(self) -> list:
+        """All categories, ordered by name."""
+        return [node.category for node in self.nodes.values()]
+
+    def node(self, category) -> CategoryNode:
+        """Return the node of a category or category id."""
+        return self.nodes[getattr(category, 'id', category)]
+
+    def named(self, name: str):
+        """Return the category with the given name, None if there is none."""
+        node = self.names.get(name)
+        return node.category if node else None
+
+    def walk(self):
+        """Yield all nodes depth first, top level categories in name order."""
+        for root in self.roots:
+            yield from root.walk()
+
+def category_tree_load(user_id: int) -> CategoryTree:
+    """
+    Load all categories of a user with one query and build the tree.
+
+    Args:
+        user_id (int): The ID of the user whose categories are loaded.
+
+    Returns:
+        CategoryTree: The category forest of the user.
+    """
+    categories = db.session.scalars(
+        sa.select(Category).where(Category.user_id == user_id).order_by(Category.name)
+    ).all()
+    return CategoryTree(categories)
+
+def category_tree_return(user_id: int) -> CategoryTree:
+    """
+    Return the category tree of a user, loaded at most once per request.
+
+    Args:
+        user_id (int): The ID of the user whose categories are loaded.
+
+    Returns:
+        CategoryTree: The category forest of the user.
+    """
+    if 'category_trees' not in g:
+        g.category_trees = {}
+    if user_id not in g.category_trees:
+        g.category_trees[user_id] = category_tree_load(user_id)
+    return g.category_trees[user_id]
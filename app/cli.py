@@ -0,0 +1,122 @@
+# cli.py
+
+import click
+from flask import Blueprint, current_app
+from app import db
+
+# commands are registered on the app itself: flask seed, not flask cli seed
+bp = Blueprint('cli', __name__, cli_group=None)
+
+
+@bp.cli.command('check-query-plans')
+@click.option('--user', 'usernames', multiple=True, default=['seed0'], show_default=True,
+              help='User to render the pages as, create it with flask seed.')
+@click.option('--password', default='password', show_default=True, help='Password of these users.')
+def check_query_plans(usernames, password):
+    """Render every budgeted page and fail if any statement it issues falls back to a full table scan."""
+    from app.query_plan import query_plan_check_routes
+
+    app = current_app._get_current_object()
+    failed = False
+    for username in usernames:
+        try:
+            for url, sql, full_scans in query_plan_check_routes(app, username, password):
+                summary = ' '.join(sql.split())[:100]
+                if full_scans:
+                    failed = True
+                    click.echo(f'FULL SCAN  {url}: {summary}\n           {"; ".join(full_scans)}')
+                else:
+                    click.echo(f'ok         {url}: {summary}')
+        except LookupError as e:
+            raise click.ClickException(f'{e}, create it with flask seed.')
+
+    if failed:
+        raise SystemExit(1)
+
+
+@bp.cli.command('rebuild-rollup')
+def rebuild_rollup():
+    """Recompute the daily completion rollup from the completion log."""
+    from app.rollup import rollup_refresh
+
+    rows = rollup_refresh()
+    db.session.commit()
+    click.echo(f'{rows} rollup rows written')
+
+
+@bp.cli.command('check-category-counters')
+@click.option('--fix', is_flag=True, help='Recompute the counters of inconsistent categories.')
+def check_category_counters(fix):
+    """Fail if any category counter differs from the counted gidguds."""
+    from app.category_counters import CATEGORY_COUNTERS, category_counters_refresh, check_and_return_inconsistent_counters
+
+    inconsistent = check_and_return_inconsistent_counters()
+    for row in inconsistent:
+        differences = ', '.join(
+            f'{column} {getattr(row, column)} != {getattr(row, "actual_" + column)}'
+            for column in CATEGORY_COUNTERS if getattr(row, column) != getattr(row, 'actual_' + column)
+        )
+        click.echo(f'{row.id} {row.name}: {differences}')
+
+    if inconsistent and fix:
+        category_counters_refresh([row.id for row in inconsistent])
+        db.session.commit()
+        click.echo(f'{len(inconsistent)} categories fixed')
+    elif inconsistent:
+        raise SystemExit(1)
+    else:
+        click.echo('all category counters are consistent')
+
+
+@bp.cli.command('seed')
+@click.option('--users', default=10, show_default=True, help='Number of users.')
+@click.option('--trees', default=3, show_default=True, help='Three-level category trees per user.')
+@click.option('--children', default=2, show_default=True, help='Children per category on the lower levels.')
+@click.option('--gids', default=50, show_default=True, help='Open one-off gids per user.')
+@click.option('--recurring', default=20, show_default=True, help='Recurring gids per user.')
+@click.option('--guds', default=100, show_default=True, help='Completed one-off guds per user.')
+@click.option('--years', default=2.0, show_default=True, help='Years of completion history.')
+@click.option('--per-day', default=3.0, show_default=True, help='Average completions per user and day.')
+@click.option('--prefix', default='seed', show_default=True, help='Username prefix.')
+@click.option('--seed', 'random_seed', default=0, show_default=True, help='Random seed.')
+def seed(users, trees, children, gids, recurring, guds, years, per_day, prefix, random_seed):
+    """Fill the database with synthetic users, categories, gidguds and completions."""
+    from app.seed import SEED_PASSWORD, seed_database
+
+    created = seed_database(users, trees, children, gids, recurring, guds, years, per_day, prefix, random_seed)
+    click.echo(', '.join(f'{count} {name}' for name, count in created.items()))
+    click.echo(f'log in as {prefix}0 .. {prefix}{users - 1} with password {SEED_PASSWORD!r}')
+
+
+
+@bp.cli.command('check-query-budgets')
+@click.option('--user', 'usernames', multiple=True, default=['seed0'], show_default=True,
+              help='User to render the routes as, repeat with users of different size to catch row-dependent counts.')
+@click.option('--password', default='password', show_default=True, help='Password of these users.')
+def check_query_budgets(usernames, password):
+    """Render every budgeted route and fail if it issues more statements than its budget."""
+    from app.query_budget import query_budget_render_routes
+
+    app = current_app._get_current_object()
+    counts = {}
+    failed = False
+    for username in usernames:
+        try:
+            for render in query_budget_render_routes(app, username, password):
+                counts.setdefault((render['endpoint'], tuple(render['variant'].items())), {})[username] = render['queries']
+                status = 'ok'
+                if render['status'] >= 400:
+                    status, failed = f'HTTP {render["status"]}', True
+                elif render['queries'] > render['budget']:
+                    status, failed = 'OVER BUDGET', True
+                click.echo(f'{status:12} {username:12} {render["url"]}: {render["queries"]}/{render["budget"]}')
+        except LookupError as e:
+            raise click.ClickException(f'{e}, create it with flask seed.')
+
+    for (endpoint, variant), per_user in counts.items():
+        if len(set(per_user.values())) > 1:
+            failed = True
+            click.echo(f'ROW-DEPENDENT {endpoint} {dict(variant)}: {per_user}')
+
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,89 @@
+# conditional.py
+
+from datetime import datetime
+from functools import wraps
+import hashlib
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from pytz import utc
+from app.user_cache import user_cache_return_versions
+
+# Conditional responses
+# read-only pages of the current user carry an ETag derived from User.data_version, a matching
+# If-None-Match / If-Modified-Since is answered with 304 before the view runs any other query or renders anything.
+# The version is read from the database, the cached current_user may lag behind other processes
+
+def conditional_etag(*parts) -> str:
+    """Return a strong ETag for the current user's data version, the requested URL and further parts."""
+    key = [
+        current_user.id,
+        user_cache_return_versions(current_user.id).data_version,
+        request.endpoint,
+        sorted(request.view_args.items()),
+        sorted(request.args.items(multi=True)),
+        *parts,
+    ]
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+def conditional_time_bucket(now: datetime) -> str:
+    # open/sleeping and streaks change with the clock: per day when the scheduler bumps the version on wake-ups,
+    # else per CONDITIONAL_TIME_BUCKET seconds
+    if current_app.config['SCHEDULER_ENABLED']:
+        return now.date().isoformat()
+    return str(int(now.timestamp()) // current_app.config['CONDITIONAL_TIME_BUCKET'])
+
+def conditional_response(self_only=False, time_dependent=False, last_seen=False):
+    """
+    Answer conditional GET requests for a page of the current user with 304 while the user's data is unchanged.
+
+    Responses are left unconditional for anonymous users and while flash messages are pending,
+    as the 304 would swallow them.
+
+    Args:
+        self_only (bool): The page shows the user named in the URL, only the own page is conditional.
+        time_dependent (bool): The page changes with the clock, the ETag includes a time bucket and no Last-Modified is sent.
+        last_seen (bool): The page shows the user's last_seen, which changes without a data version bump.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (
+                request.method != 'GET'
+                or not current_user.is_authenticated
+                or '_flashes' in session
+                or (self_only and kwargs.get('username') != current_user.username)
+            ):
+                return view(*args, **kwargs)
+
+            versions = user_cache_return_versions(current_user.id)
+            parts = []
+            last_modified = versions.data_modified
+            if time_dependent:
+                parts.append(conditional_time_bucket(datetime.now(utc)))
+                last_modified = None
+            if last_seen:
+                parts.append(versions.last_seen)
+                if last_modified and versions.last_seen:
+                    last_modified = max(last_modified, versions.last_seen)
+            etag = conditional_etag(*parts)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(
+                    last_modified and request.if_modified_since
+                    and last_modified.replace(microsecond=0) <= request.if_modified_since
+                )
+
+            response = make_response('', 304) if not_modified else make_response(view(*args, **kwargs))
+            if response.status_code not in (200, 304):
+                return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
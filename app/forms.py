@@ -5,6 +5,7 @@ from wtforms.validators import ValidationError, DataRequired, Email, EqualTo, Le
 import sqlalchemy as sa
 from app import db
 from app.models import User, GidGud, Category
+from app.utils import category_return_by_name
 from flask import current_app, request
 
 
@@ -83,7 +84,7 @@ class CreateCategoryForm(FlaskForm):
     submit = SubmitField('Create Category')
 
     def validate_name(self, name):
-        category = db.session.scalar(sa.select(Category).where(Category.name == name.data))
+        category = category_return_by_name(name.data)
         if category is not None:
             raise ValidationError('This category already exists.')
 
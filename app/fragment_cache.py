@@ -0,0 +1,96 @@
+# fragment_cache.py
+
+from collections import OrderedDict
+import threading
+from flask import current_app
+from markupsafe import Markup
+from werkzeug.utils import import_string
+from app.user_cache import user_cache_return_versions
+
+# Rendered-fragment cache
+# keys contain the user's data_version, so a change never has to delete anything, stale entries just age out
+
+class LRUCacheBackend:
+    """
+    In-process cache holding at most FRAGMENT_CACHE_SIZE entries, the least recently used are evicted first.
+    """
+
+    def __init__(self, app):
+        self.max_entries = app.config['FRAGMENT_CACHE_SIZE']
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class FragmentCache:
+    """
+    Cache rendered template fragments per user and data version.
+
+    The backend is created on first use from FRAGMENT_CACHE_BACKEND, LRUCacheBackend if it is not set.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    backend_class = current_app.config['FRAGMENT_CACHE_BACKEND'] or LRUCacheBackend
+                    if isinstance(backend_class, str):
+                        backend_class = import_string(backend_class)
+                    self._backend = backend_class(current_app._get_current_object())
+        return self._backend
+
+    def reset(self) -> None:
+        """Drop the backend and its entries, the next use builds a new one from the current config."""
+        with self._lock:
+            self._backend = None
+
+    def key(self, name: str, user, *parts) -> str:
+        """Return the cache key of a fragment of a user at the user's current data version."""
+        data_version = user_cache_return_versions(user.id).data_version
+        return ':'.join(['fragment', name, str(user.id), str(data_version), *map(str, parts)])
+
+    def render(self, name: str, user, *parts, render) -> Markup:
+        """
+        Return a cached fragment, rendering and storing it on a miss.
+
+        Args:
+            name (str): The name of the fragment, e.g. 'feed'.
+            user (User): The user whose data the fragment shows.
+            *parts: Further values the fragment depends on, e.g. the page cursor.
+            render (callable): Renders the fragment, including any queries it needs.
+
+        Returns:
+            Markup: The rendered fragment.
+        """
+        key = self.key(name, user, *parts)
+        html = self.backend.get(key)
+        if html is None:
+            html = str(render())
+            self.backend.set(key, html)
+        return Markup(html)
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,85 @@
+# instrumentation.py
+
+import json
+import time
+from flask import current_app, g, has_request_context, request
+import sqlalchemy as sa
+
+# Per-request SQL instrumentation
+# every statement executed while a request is handled is counted and timed on flask.g, the totals are sent
+# as a Server-Timing header and requests over the SLOW_REQUEST_* thresholds are logged with their SQL
+
+def instrumentation_return_stats():
+    """Return the SQL statistics of the current request, creating them on first use."""
+    if 'sql_stats' not in g:
+        g.sql_stats = {'queries': 0, 'seconds': 0.0, 'statements': []}
+    return g.sql_stats
+
+@sa.event.listens_for(sa.engine.Engine, 'before_cursor_execute')
+def instrumentation_before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+@sa.event.listens_for(sa.engine.Engine, 'after_cursor_execute')
+def instrumentation_after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or not connection.info.get('query_started'):
+        return
+    seconds = time.perf_counter() - connection.info['query_started'].pop()
+    stats = instrumentation_return_stats()
+    stats['queries'] += 1
+    stats['seconds'] += seconds
+    if len(stats['statements']) < current_app.config['SLOW_REQUEST_MAX_STATEMENTS']:
+        stats['statements'].append({'sql': statement, 'ms': round(seconds * 1000, 2)})
+    if 'sql_capture' in g:
+        g.sql_capture.append((statement, parameters[0] if executemany else parameters))
+
+@sa.event.listens_for(sa.engine.Engine, 'handle_error')
+def instrumentation_handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+def instrumentation_capture_statements() -> list:
+    """
+    Record the SQL and parameters of every statement the following requests of this app context issue.
+
+    Returns:
+        list: (sql, parameters) tuples, filled while the requests run. Of an executemany only the first parameters are kept.
+    """
+    g.sql_capture = []
+    return g.sql_capture
+
+def instrumentation_start_request():
+    g.request_started = time.perf_counter()
+    g.sql_stats = {'queries': 0, 'seconds': 0.0, 'statements': []}
+
+def instrumentation_finish_request(response):
+    if 'request_started' not in g:
+        return response
+    total_ms = (time.perf_counter() - g.request_started) * 1000
+    stats = instrumentation_return_stats()
+    db_ms = stats['seconds'] * 1000
+
+    if current_app.config['SERVER_TIMING']:
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.2f};desc="{stats["queries"]} queries", app;dur={total_ms:.2f}'
+        )
+
+    if stats['queries'] > current_app.config['SLOW_REQUEST_QUERIES'] or total_ms > current_app.config['SLOW_REQUEST_MS']:
+        current_app.logger.warning('Slow request %s', json.dumps({
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats['queries'],
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'statements': stats['statements'],
+        }))
+    return response
+
+def instrumentation_init_app(app):
+    app.before_request(instrumentation_start_request)
+    app.after_request(instrumentation_finish_request)
@@ -0,0 +1,108 @@
+# last_seen.py
+
+from datetime import datetime, timedelta
+import atexit
+import threading
+from flask import current_app
+from app.models import User
+from app.user_cache import user_cache
+from app import db
+import sqlalchemy as sa
+
+# Write-behind buffer for User.last_seen
+# requests only record the timestamp in memory, a background thread writes all pending values in one UPDATE
+
+class LastSeenBuffer:
+    """
+    Collect last_seen timestamps in memory and flush them periodically in one batched UPDATE ... CASE.
+
+    A timestamp is only buffered if the stored (or already buffered) value is older than
+    LAST_SEEN_GRANULARITY seconds, so most requests do not touch the buffer at all.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def touch(self, user, now: datetime) -> bool:
+        """
+        Record that a user was seen.
+
+        Args:
+            user (User): The user that made the request.
+            now (datetime): The time of the request.
+
+        Returns:
+            bool: True if the timestamp was buffered, False if the known value was fresh enough.
+        """
+        granularity = timedelta(seconds=current_app.config['LAST_SEEN_GRANULARITY'])
+        with self._lock:
+            latest = self._pending.get(user.id) or user.last_seen
+            if latest is not None and now - latest < granularity:
+                return False
+            self._pending[user.id] = now
+        self._start(current_app._get_current_object())
+        return True
+
+    def flush(self) -> int:
+        """
+        Write all pending timestamps in a single UPDATE statement. Needs an app context.
+
+        Returns:
+            int: The number of users whose last_seen was written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            last_seen = sa.case(
+                {user_id: sa.literal(seen, User.last_seen.type) for user_id, seen in pending.items()},
+                value=User.id
+            )
+            db.session.execute(
+                sa.update(User).where(User.id.in_(pending)).values(last_seen=last_seen),
+                execution_options={'synchronize_session': False}
+            )
+            user_cache.invalidate_on_commit(db.session, *pending)
+            db.session.commit()
+            return len(pending)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Flushing last_seen failed, keeping {len(pending)} timestamps: {e}")
+            # keep the values for the next flush unless newer ones arrived in the meantime
+            with self._lock:
+                for user_id, seen in pending.items():
+                    self._pending.setdefault(user_id, seen)
+            return 0
+
+    def _start(self, app):
+        # started lazily on the first buffered timestamp, so the thread lives in the serving process
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is None:
+                atexit.register(self.stop, app)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(app,), name='last-seen-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self, app):
+        interval = app.config['LAST_SEEN_FLUSH_INTERVAL']
+        while not self._stop.wait(interval):
+            with app.app_context():
+                self.flush()
+
+    def stop(self, app):
+        """Stop the flush thread and write what is still pending."""
+        self._stop.set()
+        with app.app_context():
+            self.flush()
+
+
+last_seen_buffer = LastSeenBuffer()
@@ -0,0 +1,152 @@
+# logging_pipeline.py
+
+import atexit
+from datetime import datetime
+import json
+import logging
+from flask.logging import default_handler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, SMTPHandler
+import os
+import queue
+import threading
+import time
+from pytz import utc
+
+# Non-blocking logging
+# app.logger only puts records on a queue, a QueueListener thread writes them to the rotating file and sends the
+# error mails, so request threads never wait for disk rotation or SMTP
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class MailThrottleFilter(logging.Filter):
+    """
+    Drop repeated and excess error mails.
+
+    A record with the same origin and first message line as one mailed within the last `window` seconds is dropped,
+    and at most `limit` mails are sent per window. The number of dropped records is added to the next mail.
+    Keys older than the window are forgotten, so the filter holds at most the errors of one window.
+    """
+
+    def __init__(self, window: int, limit: int):
+        super().__init__()
+        self.window = window
+        self.limit = limit
+        self._sent = {}
+        self._recent = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        now = time.monotonic()
+        # the QueueHandler already merged args and traceback into msg, its first line identifies the error
+        key = (record.pathname, record.lineno, str(record.msg).split('\n', 1)[0])
+        with self._lock:
+            self._recent = [sent for sent in self._recent if now - sent < self.window]
+            self._sent = {sent_key: sent for sent_key, sent in self._sent.items() if now - sent < self.window}
+            if key in self._sent or len(self._recent) >= self.limit:
+                self._dropped += 1
+                return False
+            self._sent[key] = now
+            self._recent.append(now)
+            if self._dropped:
+                record.msg = f'{record.msg}\n\n({self._dropped} similar or excess error mails were suppressed)'
+                self._dropped = 0
+        return True
+
+def logging_return_formatter(app) -> logging.Formatter:
+    if app.config['LOG_JSON']:
+        return JSONFormatter()
+    return logging.Formatter(app.config['LOG_FORMAT'])
+
+def logging_return_handlers(app) -> list[logging.Handler]:
+    """Create the handlers the listener thread writes to: the rotating file and, outside debug mode, error mails."""
+    handlers = []
+
+    log_dir = app.config['LOG_DIR']
+    if not os.path.exists(log_dir):
+        os.mkdir(log_dir)
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, 'gidgud.log'),
+        maxBytes=app.config['LOG_MAX_BYTES'],
+        backupCount=app.config['LOG_BACKUP_COUNT']
+    )
+    file_handler.setFormatter(logging_return_formatter(app))
+    file_handler.setLevel(logging.INFO)
+    handlers.append(file_handler)
+
+    if not app.debug and app.config['MAIL_SERVER']:
+        auth = None
+        if app.config['MAIL_USERNAME'] or app.config['MAIL_PASSWORD']:
+            auth = (app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
+        secure = None
+        if app.config['MAIL_USE_TLS']:
+            secure = ()
+        mail_handler = SMTPHandler(
+            mailhost=(app.config['MAIL_SERVER'], app.config['MAIL_PORT']),
+            fromaddr='no-reply@' + app.config['MAIL_SERVER'],
+            toaddrs=app.config['ADMINS'], subject='GidGud Failure',
+            credentials=auth, secure=secure)
+        mail_handler.setLevel(logging.ERROR)
+        mail_handler.addFilter(MailThrottleFilter(app.config['MAIL_THROTTLE_WINDOW'], app.config['MAIL_THROTTLE_LIMIT']))
+        handlers.append(mail_handler)
+
+    return handlers
+
+def logging_stop(app):
+    """Flush the queue and stop the app's listener thread, if it is still running."""
+    listener = app.extensions.pop('logging_listener', None)
+    if listener is not None:
+        listener.stop()
+
+def logging_restart(app):
+    """
+    Give a forked child its own queue and listener thread.
+
+    The parent's thread isn't copied, and it may have been waiting inside the queue at the fork, leaving the
+    child's copy unusable. Records queued before the fork stay with the parent, which writes them.
+    """
+    listener = app.extensions.get('logging_listener')
+    if listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in app.logger.handlers:
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            handler.queue = log_queue
+    restarted = QueueListener(log_queue, *listener.handlers, respect_handler_level=listener.respect_handler_level)
+    restarted.start()
+    app.extensions['logging_listener'] = restarted
+
+def logging_configure(app) -> QueueListener:
+    """
+    Route app.logger through a queue to the file and mail handlers and start the listener thread.
+
+    Returns:
+        QueueListener: The started listener, kept in app.extensions['logging_listener'] and stopped (and drained) at exit.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *logging_return_handlers(app), respect_handler_level=True)
+    listener.start()
+    app.extensions['logging_listener'] = listener
+    atexit.register(logging_stop, app)
+
+    app.logger.addHandler(QueueHandler(log_queue))
+    # Flask's stderr handler would still format and write every record on the request thread. The queue has no
+    # console handler, so debug runs keep it
+    if not app.debug:
+        app.logger.removeHandler(default_handler)
+    app.logger.setLevel(getattr(logging, app.config['LOG_LEVEL']))
+    return listener
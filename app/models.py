@@ -1,5 +1,5 @@
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 import sqlalchemy as sa
 import sqlalchemy.orm as so
@@ -8,9 +8,29 @@ from flask_login import UserMixin
 from hashlib import md5
 from pytz import utc
 
-# Define a function to generate ISO 8601 formatted strings as timestamps
-def iso_now():
-    return datetime.now(utc).isoformat()
+# Define a function to generate timezone aware UTC timestamps
+def utc_now():
+    return datetime.now(utc)
+
+class UTCDateTime(sa.TypeDecorator):
+    """
+    DateTime column stored as naive UTC and returned as timezone aware UTC.
+
+    SQLite has no timezone support, so aware values are normalized to UTC before they are written.
+    Values stored this way sort and compare correctly in SQL.
+    """
+    impl = sa.DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None:
+            value = value.replace(tzinfo=utc)
+        return value
 
 class User(UserMixin, db.Model):
 
@@ -23,10 +43,14 @@ class User(UserMixin, db.Model):
     categories: so.Mapped[list['Category']] = so.relationship('Category', back_populates='user')
 
     about_me: so.Mapped[Optional[str]] = so.mapped_column(sa.String(140))
+    # incremented and stamped in the same transaction as every change to the user's gidguds, categories or profile,
+    # cached renderings and ETags derived from it become stale on change
+    data_version: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0')
+    data_modified: so.Mapped[Optional[datetime]] = so.mapped_column(UTCDateTime(), nullable=True)
     last_seen: so.Mapped[Optional[datetime]] = so.mapped_column(
-        sa.String(),
+        UTCDateTime(),
         index=True,
-        default=iso_now
+        default=utc_now
     )
 
     def __repr__(self):
@@ -47,37 +71,47 @@ class GidGud(db.Model):
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
     body: so.Mapped[str] = so.mapped_column(sa.String(140))
     timestamp: so.Mapped[datetime] = so.mapped_column(
-        sa.String(),
-        index=True,
-        default=iso_now
+        UTCDateTime(),
+        default=utc_now
     )
-    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(User.id), index=True)
+    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(User.id))
 
     recurrence_rhythm: so.Mapped[int] = so.mapped_column(sa.Integer(), default=0)
     time_unit: so.Mapped[Optional[str]] = so.mapped_column(sa.Enum('minutes', 'hours', 'days', 'weeks', 'months', nullable=True))
     next_occurrence: so.Mapped[Optional[datetime]] = so.mapped_column(
-        sa.String(),
-        index=True,
+        UTCDateTime(),
         nullable=True,
-        default=None
+        default=None,
+        active_history=True
     )
 
     amount: so.Mapped[int] = so.mapped_column(sa.Integer(), default=1)
     unit: so.Mapped[str] = so.mapped_column(sa.String(10), nullable=True)
     times: so.Mapped[int] = so.mapped_column(sa.Integer(), default=1)
 
-    completed: so.Mapped[datetime] = so.mapped_column(
-        sa.String(),
-        index=True,
+    completed: so.Mapped[Optional[datetime]] = so.mapped_column(
+        UTCDateTime(),
         nullable=True,
-        default=None
+        default=None,
+        active_history=True
     )
 
     archived: so.Mapped[bool] = so.mapped_column(sa.Boolean(), default=False)
 
-    category_id: so.Mapped[int] = so.mapped_column(sa.Integer, sa.ForeignKey('category.id'))
+    # category_id, completed and next_occurrence keep their old values on change for the category counters
+    category_id: so.Mapped[int] = so.mapped_column(sa.Integer, sa.ForeignKey('category.id'), index=True, active_history=True)
     category: so.Mapped['Category'] = so.relationship('Category', back_populates='gidguds')
     author: so.Mapped['User'] = so.relationship(back_populates='gidguds')
+    completions: so.WriteOnlyMapped['Completion'] = so.relationship(back_populates='gidgud', passive_deletes=True)
+
+    # Composite indexes for the hot access paths: every listing filters by user and completed,
+    # the feed pages by timestamp and the open/sleeping split compares next_occurrence.
+    # The scheduler reads the sleeping gids of all users, without a user_id to lead with
+    __table_args__ = (
+        sa.Index('ix_gid_gud_user_id_completed_timestamp', 'user_id', 'completed', 'timestamp'),
+        sa.Index('ix_gid_gud_user_id_completed_next_occurrence', 'user_id', 'completed', 'next_occurrence'),
+        sa.Index('ix_gid_gud_completed_next_occurrence', 'completed', 'next_occurrence'),
+    )
 
     def __repr__(self):
         return '<GidGud {}>'.format(self.body)
@@ -91,11 +125,29 @@ class Category(db.Model):
     name: so.Mapped[str] = so.mapped_column(sa.String(20))
     user_id: so.Mapped[int] = so.mapped_column(sa.Integer, db.ForeignKey('user.id'))
     user: so.Mapped['User'] = so.relationship('User', back_populates='categories')
-    parent_id: so.Mapped[Optional[int]] = so.mapped_column(sa.Integer, db.ForeignKey('category.id'), nullable=True)
+    parent_id: so.Mapped[Optional[int]] = so.mapped_column(sa.Integer, db.ForeignKey('category.id'), nullable=True, index=True)
     parent: so.Mapped[Optional['Category']] = so.relationship('Category', remote_side=[id])
     children: so.Mapped[list['Category']] = so.relationship('Category', back_populates='parent', remote_side=[parent_id], uselist=True)
     gidguds: so.Mapped[Optional[list['GidGud']]] = so.relationship('GidGud', back_populates='category')
 
+    # Materialized path of the ancestor ids including the own id, e.g. '/1/4/9/', and the level (0-2).
+    # Set on insert by category_set_path, kept up to date on parent changes by category_handle_move_paths
+    path: so.Mapped[Optional[str]] = so.mapped_column(sa.String(64), index=True, nullable=True)
+    depth: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+
+    # Denormalized gidgud counters per state, kept up to date by the GidGud mapper events below.
+    # Bulk updates bypass the events and call category_counters_refresh. Sleeping means next_occurrence is set,
+    # the recurrence scheduler clears it when the gid is due, pages showing the counters wake the due gids first
+    open_count: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0')
+    sleeping_count: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0')
+    completed_count: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0')
+    gidgud_count: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0')
+
+    # category names are unique per user, the constraint's index serves the name lookups
+    __table_args__ = (
+        sa.UniqueConstraint('user_id', 'name', name='uq_category_user_id_name'),
+    )
+
     def __repr__(self):
         return '<Category {}>'.format(self.name)
 
@@ -103,7 +155,114 @@ class Category(db.Model):
     # TODO: prevent user from naming categories 0, Null, default, No Parent, No Children, None
     # TODO: assure prevented names can't be achieved by tricks, like other encodings, ASCII etc
 
+class Completion(db.Model):
+    """
+    Append-only log entry for one completion of a gidgud.
+
+    Recurring gidguds stay a single live row, their history lives in this narrow table.
+    """
+
+    id: so.Mapped[int] = so.mapped_column(primary_key=True)
+    gidgud_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(GidGud.id, ondelete='CASCADE'))
+    completed_at: so.Mapped[datetime] = so.mapped_column(UTCDateTime(), default=utc_now)
+    amount: so.Mapped[int] = so.mapped_column(sa.Integer(), default=1)
+
+    gidgud: so.Mapped['GidGud'] = so.relationship(back_populates='completions')
+
+    __table_args__ = (
+        sa.Index('ix_completion_gidgud_id_completed_at', 'gidgud_id', 'completed_at'),
+    )
+
+    def __repr__(self):
+        return '<Completion {} at {}>'.format(self.gidgud_id, self.completed_at)
+
+class CompletionDaily(db.Model):
+    """
+    Daily rollup of the completion log per user and category, maintained by app/rollup.py.
+
+    A year of history is about 365 rows per category, independent of how often gidguds were completed.
+    """
+    __tablename__ = 'completion_daily'
+
+    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(User.id), primary_key=True)
+    category_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('category.id'), primary_key=True)
+    day: so.Mapped[date] = so.mapped_column(sa.Date(), primary_key=True)
+    count: so.Mapped[int] = so.mapped_column(sa.Integer(), default=0)
+    amount: so.Mapped[int] = so.mapped_column(sa.Integer(), default=0)
+    times: so.Mapped[int] = so.mapped_column(sa.Integer(), default=0)
+
+    def __repr__(self):
+        return '<CompletionDaily {} {} {}>'.format(self.category_id, self.day, self.count)
+
+@sa.event.listens_for(Category, 'after_insert')
+def category_set_path(mapper, connection, target):
+    # the id is only known after the insert, so the path is written right behind it in the same flush
+    category_table = Category.__table__
+    parent_path, parent_depth = '/', -1
+    if target.parent_id is not None:
+        parent_path, parent_depth = connection.execute(
+            sa.select(category_table.c.path, category_table.c.depth).where(category_table.c.id == target.parent_id)
+        ).one()
+    path = f'{parent_path}{target.id}/'
+    depth = parent_depth + 1
+    connection.execute(category_table.update().where(category_table.c.id == target.id).values(path=path, depth=depth))
+    so.attributes.set_committed_value(target, 'path', path)
+    so.attributes.set_committed_value(target, 'depth', depth)
+
+def gidgud_counter_column(completed, next_occurrence) -> str:
+    # the Category counter a gidgud in this state is counted in
+    if completed is not None:
+        return 'completed_count'
+    if next_occurrence is not None:
+        return 'sleeping_count'
+    return 'open_count'
+
+def category_shift_counters(connection, category_id, column, delta):
+    category_table = Category.__table__
+    connection.execute(
+        category_table.update()
+        .where(category_table.c.id == category_id)
+        .values({column: category_table.c[column] + delta, 'gidgud_count': category_table.c.gidgud_count + delta})
+    )
+
+@sa.event.listens_for(GidGud, 'after_insert')
+def gidgud_count_insert(mapper, connection, target):
+    category_shift_counters(connection, target.category_id, gidgud_counter_column(target.completed, target.next_occurrence), 1)
+
+@sa.event.listens_for(GidGud, 'after_delete')
+def gidgud_count_delete(mapper, connection, target):
+    category_shift_counters(connection, target.category_id, gidgud_counter_column(target.completed, target.next_occurrence), -1)
+
+@sa.event.listens_for(GidGud, 'after_update')
+def gidgud_count_update(mapper, connection, target):
+    attrs = sa.inspect(target).attrs
+
+    def old_value(key):
+        history = attrs[key].history
+        return history.deleted[0] if history.deleted else getattr(target, key)
+
+    old = (old_value('category_id'), gidgud_counter_column(old_value('completed'), old_value('next_occurrence')))
+    new = (target.category_id, gidgud_counter_column(target.completed, target.next_occurrence))
+    if old != new:
+        category_shift_counters(connection, *old, -1)
+        category_shift_counters(connection, *new, 1)
+
+def user_bump_data_version(*user_ids: int) -> None:
+    """
+    Increment the data version of the given users and stamp data_modified. Does not commit.
+
+    Args:
+        *user_ids (int): The IDs of the users whose data changed.
+    """
+    db.session.execute(
+        sa.update(User).where(User.id.in_(set(user_ids))).values(data_version=User.data_version + 1, data_modified=utc_now()),
+        execution_options={'synchronize_session': False}
+    )
+    from app.user_cache import user_cache
+    user_cache.invalidate_on_commit(db.session, *user_ids)
+
 @login.user_loader
 def load_user(id):
-
-    return db.session.get(User, int(id))
+    # a detached, read-only copy from the user cache, see app/user_cache.py
+    from app.user_cache import user_cache
+    return user_cache.load(int(id))
@@ -0,0 +1,129 @@
+# query_budget.py
+
+import json
+from flask import current_app, request, url_for
+import sqlalchemy as sa
+from app import db
+from app.instrumentation import instrumentation_capture_statements, instrumentation_return_stats
+
+# Query budgets
+# every route declares the maximum number of SQL statements a request may issue, independent of the number of rows.
+# Requests over budget are logged, with QUERY_BUDGET_STRICT they fail, 'flask check-query-budgets' renders every route
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+def query_budget(max_queries: int, safe: bool = True, variants: tuple = ({},)):
+    """
+    Declare the maximum number of SQL statements a request to the decorated view may issue.
+
+    Args:
+        max_queries (int): The budget, including the user load.
+        safe (bool): False for views that change data on GET, 'flask check-query-budgets' doesn't request them.
+        variants (tuple): Query string arguments 'flask check-query-budgets' requests the view with.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        view.query_budget_safe = safe
+        view.query_budget_variants = variants
+        return view
+    return decorator
+
+def query_budget_check(response):
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is None:
+        return response
+    stats = instrumentation_return_stats()
+    if stats['queries'] > budget:
+        message = 'Query budget of {} exceeded by {} with {} statements: {}'.format(
+            budget, request.endpoint, stats['queries'], json.dumps([statement['sql'] for statement in stats['statements']])
+        )
+        if current_app.config['QUERY_BUDGET_STRICT']:
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+    return response
+
+def query_budget_init_app(app):
+    app.after_request(query_budget_check)
+
+def query_budget_return_route_ids(user_id: int) -> dict:
+    """Return the IDs filling the <id> of the edit pages: the deepest category and the first gidgud of the user."""
+    from app.models import GidGud, Category
+    return {
+        'main.edit_category': db.session.scalar(
+            sa.select(Category.id).where(Category.user_id == user_id).order_by(Category.depth.desc(), Category.id)
+        ),
+        'main.edit_gidgud': db.session.scalar(sa.select(GidGud.id).where(GidGud.user_id == user_id).order_by(GidGud.id)),
+    }
+
+def query_budget_return_routes(app) -> list[tuple[str, dict]]:
+    """Return (endpoint, query string variant) of every budgeted, safe GET route, ordered by URL rule."""
+    routes, endpoints = [], set()
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        view = app.view_functions[rule.endpoint]
+        # '/' and '/index' are the same view, it is rendered once
+        if 'GET' not in rule.methods or not getattr(view, 'query_budget_safe', False) or rule.endpoint in endpoints:
+            continue
+        endpoints.add(rule.endpoint)
+        routes += [(rule.endpoint, variant) for variant in view.query_budget_variants]
+    return routes
+
+def query_budget_render_routes(app, username: str, password: str):
+    """
+    Log in as a user and request every budgeted, safe GET route with each of its variants.
+
+    Renders are cold: the fragment and user caches are switched off, as they would hide row-dependent queries.
+    Both are process-wide and read their size when their backend is built, so the backends are rebuilt.
+
+    Args:
+        app (Flask): The application, its config is changed for the renders.
+        username (str): The user to render the routes as.
+        password (str): The password of the user.
+
+    Yields:
+        dict: endpoint, variant, url, status, budget, queries and statements, the (sql, parameters) the request issued.
+    """
+    from app.fragment_cache import fragment_cache
+    from app.models import User
+    from app.user_cache import user_cache
+
+    app.config.update(WTF_CSRF_ENABLED=False, FRAGMENT_CACHE_SIZE=0, USER_CACHE_SIZE=0, QUERY_BUDGET_STRICT=False)
+    fragment_cache.reset()
+    user_cache.reset()
+    with app.app_context():
+        user_id = db.session.scalar(sa.select(User.id).where(User.username == username))
+        if user_id is None:
+            raise LookupError(f'Unknown user {username}')
+        ids = query_budget_return_route_ids(user_id)
+
+    client = app.test_client()
+    # every request gets its own app context, else flask.g and its request caches would be shared
+    with app.app_context():
+        login = client.post('/login', data={'username': username, 'password': password})
+    if login.status_code != 302:
+        raise LookupError(f'Login as {username} failed')
+
+    rules = {}
+    for rule in app.url_map.iter_rules():
+        rules.setdefault(rule.endpoint, rule)
+    for endpoint, variant in query_budget_return_routes(app):
+        rule = rules[endpoint]
+        values = {'username': username, 'id': ids.get(endpoint)}
+        values = {key: value for key, value in values.items() if key in rule.arguments}
+        if None in values.values():
+            continue
+        with app.test_request_context():
+            url = url_for(endpoint, **values, **variant)
+        with app.app_context():
+            statements = instrumentation_capture_statements()
+            response = client.get(url)
+        yield {
+            'endpoint': endpoint,
+            'variant': variant,
+            'url': url,
+            'status': response.status_code,
+            'budget': app.view_functions[endpoint].query_budget,
+            'queries': len(statements),
+            'statements': statements,
+        }
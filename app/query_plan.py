@@ -0,0 +1,72 @@
+# query_plan.py
+
+import re
+from app import db
+from app.query_budget import query_budget_render_routes
+
+# Query plan verification
+# every budgeted page is rendered, the statements it issues are captured with their parameters and run
+# through EXPLAIN QUERY PLAN, none of them may scan a whole table
+
+# matches 'SCAN gid_gud', 'SCAN TABLE gid_gud' and 'SCAN gid_gud USING INDEX ...' (a full index walk)
+FULL_SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+# statements with a plan, INSERT ... VALUES always has none
+EXPLAINED_STATEMENTS = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE)\b', re.IGNORECASE)
+
+def explain_query_plan(sql: str, parameters=()) -> list[str]:
+    """
+    Run EXPLAIN QUERY PLAN for a statement and return the detail line of every plan step.
+
+    Args:
+        sql (str): The SQL as sent to the database.
+        parameters: The parameters it was sent with.
+
+    Returns:
+        list[str]: The plan details, e.g. 'SEARCH gid_gud USING INDEX ix_gid_gud_category_id (category_id=?)'.
+    """
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parameters).all()
+    return [row[3] for row in rows]
+
+def check_and_return_full_table_scans(sql: str, parameters=()) -> list[str]:
+    """
+    Return the plan steps of a statement that scan a whole table.
+
+    Scans of subqueries and CTEs are ignored, only tables of the models count.
+
+    Args:
+        sql (str): The SQL as sent to the database.
+        parameters: The parameters it was sent with.
+
+    Returns:
+        list[str]: The offending plan details, empty if every table is searched through an index.
+    """
+    tables = db.metadata.tables.keys()
+    full_scans = []
+    for detail in explain_query_plan(sql, parameters):
+        match = FULL_SCAN_PATTERN.match(detail)
+        # joined eager loads alias tables as <table>_<n>
+        if match and re.sub(r'_\d+$', '', match.group(1)) in tables:
+            full_scans.append(detail)
+    return full_scans
+
+def query_plan_check_routes(app, username: str, password: str):
+    """
+    Render every budgeted page as a user and check the plan of every statement it issues.
+
+    Args:
+        app (Flask): The application.
+        username (str): The user to render the pages as.
+        password (str): The password of the user.
+
+    Yields:
+        tuple: (url, sql, full scans) per distinct statement of a page, the full scans are empty if it is fine.
+    """
+    for render in query_budget_render_routes(app, username, password):
+        seen = set()
+        for sql, parameters in render['statements']:
+            if sql in seen or not EXPLAINED_STATEMENTS.match(sql):
+                continue
+            seen.add(sql)
+            with app.app_context():
+                yield render['url'], sql, check_and_return_full_table_scans(sql, parameters)
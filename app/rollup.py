@@ -0,0 +1,160 @@
+# rollup.py
+
+from app.models import GidGud, Completion, CompletionDaily
+from app import db
+from sqlalchemy.dialects import postgresql, sqlite
+import sqlalchemy as sa
+from pytz import utc
+
+# Daily completion rollup
+# completion_daily is updated in the same transaction as the completion log, history views read it instead of the log
+
+# dialects supporting INSERT ... ON CONFLICT DO UPDATE, rollup_upsert falls back to SELECT, UPDATE and INSERT on others
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+def rollup_upsert_statement(insert):
+    """Build the INSERT ... ON CONFLICT DO UPDATE adding count, amount and times to a rollup row."""
+    table = CompletionDaily.__table__
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.category_id, table.c.day],
+        set_={
+            'count': table.c.count + statement.excluded.count,
+            'amount': table.c.amount + statement.excluded.amount,
+            'times': table.c.times + statement.excluded.times,
+        }
+    )
+
+def rollup_upsert(rows: list[dict]) -> None:
+    """
+    Add count, amount and times of each row to its rollup row, creating missing rows. Does not commit.
+
+    Dialects without ON CONFLICT look up the existing rows first, then update and insert with one executemany each.
+    That is not atomic: a concurrent transaction creating the same row makes the INSERT fail with an IntegrityError.
+
+    Args:
+        rows (list[dict]): user_id, category_id, day, count, amount and times, one per rollup row.
+    """
+    insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        db.session.execute(rollup_upsert_statement(insert), rows)
+        return
+
+    table = CompletionDaily.__table__
+    existing = set(db.session.execute(
+        sa.select(table.c.user_id, table.c.category_id, table.c.day).where(sa.or_(*(
+            (table.c.user_id == row['user_id']) & (table.c.category_id == row['category_id']) & (table.c.day == row['day'])
+            for row in rows
+        )))
+    ).all())
+    updates = [row for row in rows if (row['user_id'], row['category_id'], row['day']) in existing]
+    inserts = [row for row in rows if (row['user_id'], row['category_id'], row['day']) not in existing]
+    if updates:
+        db.session.execute(
+            sa.update(table)
+            .where((table.c.user_id == sa.bindparam('b_user_id')) & (table.c.category_id == sa.bindparam('b_category_id'))
+                   & (table.c.day == sa.bindparam('b_day')))
+            .values(count=table.c.count + sa.bindparam('b_count'), amount=table.c.amount + sa.bindparam('b_amount'),
+                    times=table.c.times + sa.bindparam('b_times')),
+            [{f'b_{key}': value for key, value in row.items()} for row in updates]
+        )
+    if inserts:
+        db.session.execute(sa.insert(table), inserts)
+
+def rollup_add_completion(completion: Completion) -> None:
+    """
+    Add a completion to the daily rollup of its user and category. Does not commit.
+
+    Args:
+        completion (Completion): The new completion, with its gidgud set.
+    """
+    # a new gidgud or category only has its id after the flush
+    db.session.flush()
+    gidgud = completion.gidgud
+    rollup_upsert([{
+        'user_id': gidgud.user_id,
+        'category_id': gidgud.category_id,
+        'day': completion.completed_at.astimezone(utc).date(),
+        'count': 1,
+        'amount': completion.amount,
+        'times': gidgud.times,
+    }])
+
+def rollup_add_completions(completions: list[dict]) -> int:
+    """
+    Add many completions to the daily rollup, summed per row and written with one executemany upsert. Does not commit.
+
+    Args:
+        completions (list[dict]): user_id, category_id, completed_at, amount and times of each completion.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    totals = {}
+    for completion in completions:
+        key = (completion['user_id'], completion['category_id'], completion['completed_at'].astimezone(utc).date())
+        count, amount, times = totals.get(key, (0, 0, 0))
+        totals[key] = (count + 1, amount + completion['amount'], times + completion['times'])
+    if not totals:
+        return 0
+    rollup_upsert([
+        {'user_id': user_id, 'category_id': category_id, 'day': day, 'count': count, 'amount': amount, 'times': times}
+        for (user_id, category_id, day), (count, amount, times) in totals.items()
+    ])
+    return len(totals)
+
+def rollup_select_from_log(category_ids: list[int] | None = None) -> sa.Select:
+    """
+    Build the select aggregating the completion log into rollup rows.
+
+    Args:
+        category_ids (list[int], optional): Only aggregate completions of gidguds in these categories, defaults to all.
+
+    Returns:
+        sa.Select: Rows of (user_id, category_id, day, count, amount, times) in the column order of completion_daily.
+    """
+    day = sa.func.date(Completion.completed_at)
+    query = (
+        sa.select(
+            GidGud.user_id,
+            GidGud.category_id,
+            day,
+            sa.func.count(Completion.id),
+            sa.func.sum(Completion.amount),
+            sa.func.sum(GidGud.times),
+        )
+        .join(GidGud, Completion.gidgud_id == GidGud.id)
+        .group_by(GidGud.user_id, GidGud.category_id, day)
+    )
+    if category_ids is not None:
+        query = query.where(GidGud.category_id.in_(category_ids))
+    return query
+
+def rollup_refresh(category_ids: list[int] | None = None) -> int:
+    """
+    Recompute the rollup rows of the given categories from the completion log. Does not commit.
+
+    Used after completions changed category or were deleted, where incremental updates would need the old values.
+
+    Args:
+        category_ids (list[int], optional): The categories to recompute, defaults to all.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    db.session.flush()
+    table = CompletionDaily.__table__
+    delete = sa.delete(table)
+    if category_ids is not None:
+        delete = delete.where(table.c.category_id.in_(category_ids))
+    db.session.execute(delete)
+    result = db.session.execute(
+        sa.insert(table).from_select(
+            ['user_id', 'category_id', 'day', 'count', 'amount', 'times'],
+            rollup_select_from_log(category_ids)
+        )
+    )
+    return result.rowcount
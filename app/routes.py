@@ -1,23 +1,37 @@
-from flask import render_template, flash, redirect, url_for, request
-from app import app, db
+from flask import Blueprint, abort, current_app, render_template, flash, redirect, url_for, request
+from app import db
 from app.forms import CreateGidForm, CreateGudForm, LoginForm, RegistrationForm, EditProfileForm, EditGidGudForm, CreateCategoryForm, EditCategoryForm
 from flask_login import current_user, login_user, logout_user, login_required
 import sqlalchemy as sa
-from app.models import User, GidGud, Category
-from app.utils import category_child_protection_service, category_handle_change_parent, category_handle_reassign_gidguds, category_handle_rename, check_and_return_list_of_possible_parents, check_and_return_list_of_possible_parents_for_children, check_if_category_exists_and_return, create_new_category, gidgud_handle_complete, gidgud_handle_update, gidgud_return_dict_from_choice, log_exception, log_form_validation_errors, log_object, log_request
+from sqlalchemy.orm import selectinload
+from app.models import User, GidGud, Category, Completion, user_bump_data_version
+from app.category_tree import category_tree_return
+from app.conditional import conditional_response
+from app.query_budget import query_budget
+from app.last_seen import last_seen_buffer
+from app.rollup import rollup_add_completion, rollup_refresh
+from app.scheduler import recurrence_scheduler
+from app.user_cache import user_cache
+from app.statistics import STATISTICS_LISTS, statistics_return_counts, statistics_return_page
+from app.utils import category_child_protection_service, category_return_edit_choices, category_remember, category_return_subtree_height, category_handle_change_parent, category_handle_reassign_gidguds, category_handle_rename, check_if_category_exists_and_return, create_new_category, gidgud_handle_complete, gidgud_handle_update, gidgud_open_clause, gidgud_return_dict_from_choice, gidgud_return_feed_html, log_exception, log_form_validation_errors, log_object, log_request
 from urllib.parse import urlsplit
 from datetime import datetime, timezone
 from pytz import utc
 
+bp = Blueprint('main', __name__)
 
-@app.route('/')
-@app.route('/index')
+
+@bp.route('/')
+@bp.route('/index')
 @login_required
+@conditional_response()
+@query_budget(4)
 def index():
-    gidguds = db.session.scalars(sa.select(GidGud).where(current_user == GidGud.author))
-    return render_template('index.html', title='Home', gidguds=gidguds)
+    feed = gidgud_return_feed_html(request.args.get('after'), paginate=True)
+    return render_template('index.html', title='Home', feed=feed)
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
+@query_budget(2)
 def login():
     """
     The `login` function in this Python code handles user authentication and login functionality,
@@ -28,32 +42,36 @@ def login():
     using the 'LoginForm' class.
     """
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     form = LoginForm()
     if form.validate_on_submit():
         user = db.session.scalar(
             sa.select(User).where(User.username == form.username.data))
         if user is None or not user.check_password(form.password.data):
-            app.logger.info('%s tried logging in with invalid username or password', user.username)
+            current_app.logger.info('%s tried logging in with invalid username or password', user.username)
             flash('Invalid username or password')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or urlsplit(next_page).netloc != '':
-            next_page = url_for('index')
-        app.logger.info('%s logged in successfully', user.username)
+            next_page = url_for('main.index')
+        current_app.logger.info('%s logged in successfully', user.username)
         return redirect(next_page)
     return render_template('login.html', title='Sign In', form=form)
 
-@app.route('/logout')
+@bp.route('/logout')
+@query_budget(1, safe=False)
 def logout():
+    if current_user.is_authenticated:
+        user_cache.invalidate(current_user.id)
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
+@query_budget(4)
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     form = RegistrationForm()
     if form.validate_on_submit():
         user = User(username=form.username.data, email=form.email.data)
@@ -64,66 +82,80 @@ def register():
         db.session.add(user, def_cat)
         db.session.commit()
         flash('Congratulations, you are now a registered user!')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('register.html', title='Register', form=form)
 
-@app.route('/edit_profile', methods=['GET', 'POST'])
+@bp.route('/edit_profile', methods=['GET', 'POST'])
 @login_required
+@query_budget(4)
 def edit_profile():
     form = EditProfileForm(current_user.username)
     if form.validate_on_submit():
-        current_user.username = form.username.data
-        current_user.about_me = form.about_me.data
+        # current_user is a read-only copy from the user cache, the change invalidates the cached one on commit
+        user = db.session.get(User, current_user.id)
+        user.username = form.username.data
+        user.about_me = form.about_me.data
+        user_bump_data_version(current_user.id)
         db.session.commit()
         flash('Your changes have been saved.')
-        return redirect(url_for('edit_profile'))
+        return redirect(url_for('main.edit_profile'))
     elif request.method == 'GET':
         form.username.data = current_user.username
         form.about_me.data = current_user.about_me
     return render_template('edit_profile.html', title='Edit Profile', form=form)
 
-@app.route('/create_gid', methods=['GET', 'POST'])
+@bp.route('/create_gid', methods=['GET', 'POST'])
 @login_required
+@query_budget(8)
 def create_gid():
-    gidguds = db.session.scalars(sa.select(GidGud).where(current_user == GidGud.author))
     form = CreateGidForm()
     if form.validate_on_submit():
         category = check_if_category_exists_and_return(form.category.data)
         if not category:
             new_category = Category(name=form.category.data, user_id=current_user.id)
             db.session.add(new_category)
+            category_remember(new_category)
             category = new_category
         if form.rec_rhythm.data != 0:
             gid = GidGud(body=form.body.data, user_id=current_user.id, category=category, recurrence_rhythm=form.rec_rhythm.data, time_unit=form.time_unit.data)
         else:
             gid = GidGud(body=form.body.data, user_id=current_user.id, category=category)
         db.session.add(gid)
+        user_bump_data_version(current_user.id)
         db.session.commit()
         flash('New Gid created!')
-        return redirect(url_for('index'))
-    return render_template('create_gid.html', title='Create Gid', form=form, gidguds=gidguds)
+        return redirect(url_for('main.index'))
+    feed = gidgud_return_feed_html()
+    return render_template('create_gid.html', title='Create Gid', form=form, feed=feed)
 
-@app.route('/create_gud', methods=['GET', 'POST'])
+@bp.route('/create_gud', methods=['GET', 'POST'])
 @login_required
+@query_budget(10)
 def create_gud():
-    gidguds = db.session.scalars(sa.select(GidGud).where(current_user == GidGud.author))
     form = CreateGudForm()
     if form.validate_on_submit():
         category = check_if_category_exists_and_return(form.category.data)
         if not category:
             new_category = Category(name=form.category.data, user_id=current_user.id)
             db.session.add(new_category)
+            category_remember(new_category)
             category = new_category
         timestamp = datetime.now(timezone.utc)
         gud = GidGud(body=form.body.data, user_id=current_user.id, category=category, completed=timestamp)
         db.session.add(gud)
+        completion = Completion(gidgud=gud, completed_at=timestamp)
+        db.session.add(completion)
+        rollup_add_completion(completion)
+        user_bump_data_version(current_user.id)
         db.session.commit()
         flash('New Gud created!')
-        return redirect(url_for('index'))
-    return render_template('create_gud.html', title='Create Gud', form=form, gidguds=gidguds)
+        return redirect(url_for('main.index'))
+    feed = gidgud_return_feed_html()
+    return render_template('create_gud.html', title='Create Gud', form=form, feed=feed)
 
-@app.route('/edit_gidgud/<id>', methods=['GET', 'POST'])
+@bp.route('/edit_gidgud/<id>', methods=['GET', 'POST'])
 @login_required
+@query_budget(14)
 def edit_gidgud(id):
     gidgud = db.session.scalar(sa.select(GidGud).where(id == GidGud.id))
     # TODO: adjust template to hide recurrence fields when editing completed gidgud
@@ -131,7 +163,7 @@ def edit_gidgud(id):
     if form.validate_on_submit():
         gidgud_handle_update(gidgud, form)
         flash('Your changes have been saved.')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     elif request.method == 'GET':
         form.body.data = gidgud.body
@@ -141,31 +173,49 @@ def edit_gidgud(id):
 
     return render_template('edit_gidgud.html', title='Edit GidGud', form=form)
 
-@app.route('/delete_gidgud/<id>', methods=['GET', 'DELETE', 'POST'])
+@bp.route('/delete_gidgud/<id>', methods=['GET', 'DELETE', 'POST'])
 @login_required
+@query_budget(9, safe=False)
 def delete_gidgud(id):
-    current_gidgud = db.session.scalar(sa.select(GidGud).where(id == GidGud.id))
+    current_gidgud = db.get_or_404(GidGud, int(id))
+    if current_gidgud.user_id != current_user.id:
+        abort(404)
+    # the history goes with the gidgud, SQLite doesn't enforce the ON DELETE CASCADE by default
+    db.session.execute(sa.delete(Completion).where(Completion.gidgud_id == current_gidgud.id))
     db.session.delete(current_gidgud)
+    rollup_refresh([current_gidgud.category_id])
+    user_bump_data_version(current_gidgud.user_id)
     db.session.commit()
     flash('GidGud deleted!')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/complete_gidgud/<id>', methods=['GET', 'POST'])
+@bp.route('/complete_gidgud/<id>', methods=['GET', 'POST'])
 @login_required
+@query_budget(10, safe=False)
 def complete_gidgud(id):
-    current_gidgud = db.session.scalar(sa.select(GidGud).where(id == GidGud.id))
-    gidgud_handle_complete(current_gidgud)
-    flash('Gid completed!')
-    return redirect(url_for('index'))
-
-@app.route('/user/<username>/user_categories', methods=['GET'])
+    current_gidgud = db.get_or_404(GidGud, int(id))
+    if current_gidgud.user_id != current_user.id:
+        abort(404)
+    if gidgud_handle_complete(current_gidgud):
+        flash('Gid completed!')
+    elif current_gidgud.completed is not None:
+        flash('This GidGud is already completed.')
+    return redirect(url_for('main.index'))
+
+@bp.route('/user/<username>/user_categories', methods=['GET'])
 @login_required
+@conditional_response(time_dependent=True)
+@query_budget(7)
 def user_categories(username):
-    categories = db.session.scalars(sa.select(Category).where(current_user == Category.user))
-    return render_template('user_categories.html', title='My Categories', categories=categories)
+    # the waiting counts only drop when next_occurrence is cleared, which the scheduler may not have done yet.
+    # Three of the budgeted statements only run when gids are due: the wake-up, the counters and the version
+    recurrence_scheduler.wake_due_of_user(current_user.id)
+    tree = category_tree_return(current_user.id)
+    return render_template('user_categories.html', title='My Categories', tree=tree)
 
-@app.route('/create_category', methods=['GET', 'POST'])
+@bp.route('/create_category', methods=['GET', 'POST'])
 @login_required
+@query_budget(8)
 def create_category():
     """
     Handle requests to create a new category.
@@ -177,34 +227,33 @@ def create_category():
         flask.Response: Redirects to the user's categories page upon successful creation.
     """
     form = CreateCategoryForm()
-    categories = db.session.scalars(sa.select(Category).where(current_user == Category.user))
 
     if form.validate_on_submit():
         new_category_name = form.name.data
         create_new_category(new_category_name, current_user.id)
         flash('New Category created!')
-        return redirect(url_for('user_categories', username=current_user.username))
+        return redirect(url_for('main.user_categories', username=current_user.username))
 
+    recurrence_scheduler.wake_due_of_user(current_user.id)
+    categories = category_tree_return(current_user.id).categories
     return render_template('create_category.html', title='Create Category', form=form, categories=categories)
 
-@app.route('/edit_category/<id>', methods=['GET', 'POST'])
+@bp.route('/edit_category/<id>', methods=['GET', 'POST'])
 @login_required
+@query_budget(13)
 def edit_category(id):
     # TODO: add multiple children at once
 
-    current_category = db.session.scalar(sa.select(Category).where(id == Category.id))
+    # One query for the whole category forest, parents and children are resolved in memory
+    tree = category_tree_return(current_user.id)
+    current_node = tree.nodes.get(int(id))
+    if current_node is None:
+        abort(404)
+    current_category = current_node.category
     delete_afterwards = bool(request.args.get('dla'))
 
-    # Choices: all categories except the current category
-
-    default_parent_choices = ['No Parent'] if current_category.parent is None else [current_category.parent.name] + ['Remove Parent']
-    parent_choices = default_parent_choices + check_and_return_list_of_possible_parents(current_category)
-
-    default_gidgud_choices = ['No GidGuds'] if not current_category.gidguds else [current_category.name]
-    gidgud_reassignment_choices = default_gidgud_choices + [category.name for category in current_user.categories if category != current_category]
-
-    default_parent_choices_for_children = ['No Children'] if not current_category.children else [current_category.name]
-    parent_choices_for_children = default_parent_choices_for_children + check_and_return_list_of_possible_parents_for_children(current_category)
+    # Choices: all categories except the current category, the first entry keeps the current state
+    parent_choices, gidgud_reassignment_choices, parent_choices_for_children = category_return_edit_choices(current_node, tree)
 
     form = EditCategoryForm()
 
@@ -217,36 +266,46 @@ def edit_category(id):
 
         if form.validate_on_submit():
 
+            # The requested changes, in the order they are applied
+            changes = []
             # Check if form contains new parent
             if form.parent.data != parent_choices[0]:
-                # Assign new parent
-                category_handle_change_parent(current_category, form)
-
+                changes.append(category_handle_change_parent)
             # Check if form contains new category for gidguds
             if form.reassign_gidguds.data != gidgud_reassignment_choices[0]:
-                # Assign gidguds to new category
-                category_handle_reassign_gidguds(current_category, form)
-
+                changes.append(category_handle_reassign_gidguds)
             # Check if form contains a new parent category for the current category's children
             if form.reassign_children.data != parent_choices_for_children[0]:
-                # Assign children categories to the new parent category
-                category_child_protection_service(current_category, form)
-
+                changes.append(category_child_protection_service)
             # Check if form contains new category name
             if form.name.data != current_category.name:
-                # Assign new category name
-                category_handle_rename(current_category, form)
+                changes.append(category_handle_rename)
+
+            # One transaction: every change is checked against the tree loaded above and
+            # a change that fails discards the ones before it
+            try:
+                applied = all(change(current_category, form) for change in changes)
+                if applied and changes:
+                    user_bump_data_version(current_user.id)
+                    db.session.commit()
+            except Exception as e:
+                log_exception(e)
+                applied = False
+            if not applied:
+                db.session.rollback()
+                flash('No changes were saved.')
+                return render_template('edit_category.html', title='Edit Category', id=id, form=form, cat=current_category, node=current_node, dla=delete_afterwards)
 
             #if delete_afterwards:
             if delete_afterwards:
-                return redirect(url_for('delete_category', username=current_user.username, id=id))
-            return redirect(url_for('user_categories', username=current_user.username))
+                return redirect(url_for('main.delete_category', username=current_user.username, id=id))
+            return redirect(url_for('main.user_categories', username=current_user.username))
 
         else:
             # Form validation failed, render the form template again with error messages
             log_form_validation_errors(form)
             flash('Form validation failed. Please correct the errors and resubmit.')
-            return render_template('edit_category.html', title='Edit Category', id=id, form=form, cat=current_category, dla=delete_afterwards)
+            return render_template('edit_category.html', title='Edit Category', id=id, form=form, cat=current_category, node=current_node, dla=delete_afterwards)
 
     elif request.method == 'GET':
         # populating fields for get requests
@@ -255,47 +314,70 @@ def edit_category(id):
         form.reassign_gidguds.choices = gidgud_reassignment_choices
         form.reassign_children.choices = parent_choices_for_children
 
-    return render_template('edit_category.html', title='Edit Category', id=id, form=form, cat=current_category, dla=delete_afterwards)
+    return render_template('edit_category.html', title='Edit Category', id=id, form=form, cat=current_category, node=current_node, dla=delete_afterwards)
 
-@app.route('/delete_category/<id>', methods=['GET', 'DELETE', 'POST'])
+@bp.route('/delete_category/<id>', methods=['GET', 'DELETE', 'POST'])
 @login_required
+@query_budget(8, safe=False)
 def delete_category(id):
-    current_category = db.session.scalar(sa.select(Category).where(id == Category.id))
+    current_category = db.get_or_404(Category, int(id))
+    if current_category.user_id != current_user.id:
+        abort(404)
     if current_category.name == 'default':
         flash('The default Category may not be deleted')
-        return redirect(url_for('user_categories', username=current_user.username))
-    elif current_category.gidguds or current_category.children:
+        return redirect(url_for('main.user_categories', username=current_user.username))
+    # the counter and one indexed range query over the paths, instead of loading all categories
+    elif current_category.gidgud_count or category_return_subtree_height(current_category):
         flash('This Category has attached GidGuds or Subcategories. Please reassign before deletion.')
-        return redirect(url_for('edit_category', id=id, dla=True))
+        return redirect(url_for('main.edit_category', id=id, dla=True))
     else:
         db.session.delete(current_category)
+        user_bump_data_version(current_category.user_id)
         db.session.commit()
         flash('Category deleted!')
-    return redirect(url_for('user_categories', username=current_user.username))
+    return redirect(url_for('main.user_categories', username=current_user.username))
 
-@app.route('/user/<username>/statistics', methods=['GET'])
+@bp.route('/user/<username>/statistics', methods=['GET'])
 @login_required
+@conditional_response(time_dependent=True)
+@query_budget(6, variants=({}, {'show': 'gids'}, {'show': 'sleep'}, {'show': 'guds'}))
 def statistics(username):
-    # TODO: implement next occurrence check somewhere useful
-    # TODO: create return gidguds_function that returns open, waiting, completed and all depending on param
-    app.logger.info("starting statistics route")
+    current_app.logger.info("starting statistics route")
 
-    possible_choices = ['all', 'gids', 'sleep', 'guds']
-    gidguds = gidgud_return_dict_from_choice(['gids', 'sleep', 'guds'])
-    app.logger.info(f"{gidguds}")
+    # numpy is only imported by the first statistics request, not at worker startup
+    from app.analytics import analytics_return_summary
 
-    return render_template('statistics.html', title='My Statistic', gidguds=gidguds)
+    counts = statistics_return_counts(current_user.id)
+    analytics = analytics_return_summary(current_user.id)
 
+    # Full lists are only loaded on demand, one page at a time
+    show = request.args.get('show')
+    gidguds, next_cursor = [], None
+    if show in STATISTICS_LISTS:
+        gidguds, next_cursor = statistics_return_page(current_user.id, show, request.args.get('after'))
 
-@app.route('/user/<username>')
+    return render_template('statistics.html', title='My Statistic', counts=counts, analytics=analytics, show=show, gidguds=gidguds, next_cursor=next_cursor)
+
+
+@bp.route('/user/<username>')
 @login_required
+@conditional_response(self_only=True, time_dependent=True, last_seen=True)
+@query_budget(7)
 def user(username):
-    user = db.first_or_404(sa.select(User).where(User.username == username))
-    gidguds = db.session.scalars(sa.select(GidGud).where(current_user == GidGud.author))
-    return render_template('user.html', user=user, gidguds=gidguds)
-
-@app.before_request
+    # only the open gids are listed, the completed history and sleeping gids stay in the database
+    user = db.first_or_404(
+        sa.select(User)
+        .where(User.username == username)
+        .options(selectinload(User.categories).selectinload(Category.gidguds.and_(gidgud_open_clause(datetime.now(utc)))))
+    )
+    feed = gidgud_return_feed_html()
+    return render_template('user.html', user=user, feed=feed)
+
+@bp.before_app_request
 def before_request():
+    # started on the first request, so the thread runs in the worker process
+    if current_app.config['SCHEDULER_ENABLED']:
+        recurrence_scheduler.start(current_app._get_current_object())
     if current_user.is_authenticated:
-        current_user.last_seen = datetime.now(timezone.utc)
-        db.session.commit()
\ No newline at end of file
+        # buffered and written in batches, read-only requests don't write to the database
+        last_seen_buffer.touch(current_user, datetime.now(timezone.utc))
\ No newline at end of file
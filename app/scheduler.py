@@ -0,0 +1,186 @@
+# scheduler.py
+
+from datetime import datetime
+import heapq
+import threading
+import time
+from blinker import Namespace
+from flask import current_app
+from app.category_counters import category_counters_refresh
+from app.models import GidGud, user_bump_data_version
+from app import db
+import sqlalchemy as sa
+from pytz import utc
+
+# Recurrence scheduler
+# keeps a min-heap of upcoming next_occurrence values and wakes sleeping gids when they become due
+
+scheduler_signals = Namespace()
+
+# Sent with sender=app and rows=[(gidgud_id, user_id, category_id), ...] after a batch of gids woke up
+gidguds_due = scheduler_signals.signal('gidguds-due')
+
+class RecurrenceScheduler:
+    """
+    Background thread that clears next_occurrence of recurring gids at the moment they become due.
+
+    Due gids are woken in batched UPDATE statements and announced through the gidguds_due signal.
+    The heap is filled from the database on start, refreshed every SCHEDULER_RESYNC_INTERVAL seconds
+    (so gids completed in other processes are picked up) and fed by schedule() on every completion.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        # time.monotonic() of the last resync, the next one is due SCHEDULER_RESYNC_INTERVAL later
+        self._resynced_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app) -> None:
+        """Load the sleeping gids and start the scheduler thread, unless it is already running."""
+        if self.running:
+            return
+        with self._condition:
+            if self.running:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, args=(app,), name='recurrence-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the scheduler thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def schedule(self, gidgud_id: int, next_occurrence: datetime) -> None:
+        """
+        Register the next occurrence of a gid.
+
+        Args:
+            gidgud_id (int): The ID of the sleeping gid.
+            next_occurrence (datetime): The timezone aware time at which it becomes due.
+        """
+        if not self.running:
+            return
+        with self._condition:
+            heapq.heappush(self._heap, (next_occurrence, gidgud_id))
+            # wake the thread if the new entry is due before the one it is waiting for
+            if self._heap[0][1] == gidgud_id:
+                self._condition.notify()
+
+    def _resync(self) -> None:
+        # served by ix_gid_gud_completed_next_occurrence
+        rows = db.session.execute(
+            sa.select(GidGud.next_occurrence, GidGud.id)
+            .where(GidGud.completed.is_(None) & GidGud.next_occurrence.isnot(None))
+        ).all()
+        db.session.rollback()
+        with self._condition:
+            self._resynced_at = time.monotonic()
+            # merged, not replaced: schedule() may have pushed entries since the SELECT. Stale entries are
+            # harmless, wake_due only touches gids that are still sleeping, and they leave the heap once due
+            entries = set(self._heap)
+            entries.update(tuple(row) for row in rows)
+            self._heap = list(entries)
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, app) -> list[int]:
+        # measured from the last resync, not from this call: a steady stream of due gids would else postpone it forever
+        resync_interval = app.config['SCHEDULER_RESYNC_INTERVAL']
+        with self._condition:
+            while not self._stopped:
+                now = datetime.now(utc)
+                resync_in = self._resynced_at + resync_interval - time.monotonic()
+                if resync_in <= 0:
+                    return []
+                if self._heap and self._heap[0][0] <= now:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        due.append(heapq.heappop(self._heap)[1])
+                    return due
+                timeout = resync_in
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self._condition.wait(timeout)
+            return []
+
+    def _run(self, app):
+        with app.app_context():
+            self._resync()
+        while not self._stopped:
+            due = self._pop_due(app)
+            with app.app_context():
+                if due:
+                    self.wake_due(due)
+                else:
+                    self._resync()
+
+    def wake_due(self, gidgud_ids: list[int]) -> list:
+        """
+        Clear next_occurrence of the given gids, if they are still sleeping and due, in batched updates.
+
+        Args:
+            gidgud_ids (list[int]): IDs of gids whose next occurrence has passed.
+
+        Returns:
+            list: (gidgud_id, user_id, category_id) rows of the gids that woke up.
+        """
+        batch_size = current_app.config['SCHEDULER_BATCH_SIZE']
+        return self._wake([GidGud.id.in_(gidgud_ids[start:start + batch_size]) for start in range(0, len(gidgud_ids), batch_size)])
+
+    def wake_due_of_user(self, user_id: int) -> list:
+        """
+        Clear next_occurrence of every due gid of a user and commit.
+
+        Pages showing the sleeping_count call it before reading the counters, so they agree with the
+        time-aware open/sleeping split even while the scheduler is disabled or behind. The due gids are
+        looked up first, so read-only pages only write (and take the writer lock) when some are due.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: (gidgud_id, user_id, category_id) rows of the gids that woke up.
+        """
+        # served by ix_gid_gud_user_id_completed_next_occurrence
+        due = db.session.scalars(
+            sa.select(GidGud.id)
+            .where((GidGud.user_id == user_id) & GidGud.completed.is_(None) & (GidGud.next_occurrence <= datetime.now(utc)))
+        ).all()
+        if not due:
+            return []
+        return self.wake_due(due)
+
+    def _wake(self, conditions: list) -> list:
+        now = datetime.now(utc)
+        woken = []
+        try:
+            for condition in conditions:
+                woken += db.session.execute(
+                    sa.update(GidGud)
+                    .where(condition & GidGud.completed.is_(None) & (GidGud.next_occurrence <= now))
+                    .values(next_occurrence=None)
+                    .returning(GidGud.id, GidGud.user_id, GidGud.category_id),
+                    execution_options={'synchronize_session': False}
+                ).all()
+            if woken:
+                category_counters_refresh([category_id for _, _, category_id in woken])
+                user_bump_data_version(*(user_id for _, user_id, _ in woken))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Waking due gids failed: {e}")
+            return []
+
+        if woken:
+            gidguds_due.send(current_app._get_current_object(), rows=woken)
+        return woken
+
+
+recurrence_scheduler = RecurrenceScheduler()
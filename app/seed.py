@@ -0,0 +1,147 @@
+# seed.py
+
+from datetime import datetime, timedelta
+import random
+from app.models import User, GidGud, Category, Completion
+from app import db
+from app.category_counters import category_counters_refresh
+from app.rollup import rollup_refresh
+import sqlalchemy as sa
+from pytz import utc
+
+# Synthetic data
+# builds users with three-level category trees, recurring and one-off gids and years of completions.
+# Categories go through the ORM (their paths are set on insert), gidguds and completions are bulk inserted
+# and the counters and the daily rollup are recomputed once at the end
+
+SEED_PASSWORD = 'password'
+SEED_TIME_UNITS = ('hours', 'days', 'weeks')
+
+def seed_create_categories(user: User, trees: int, children: int) -> list[Category]:
+    """
+    Create the default category and `trees` three-level category trees for a user.
+
+    Every tree has `children` children per node on the two lower levels.
+
+    Returns:
+        list[Category]: All categories of the user, including default.
+    """
+    categories = [Category(name='default', user=user)]
+    for t in range(trees):
+        root = Category(name=f'tree{t}', user=user)
+        categories.append(root)
+        for c in range(children):
+            child = Category(name=f'tree{t}-{c}', user=user, parent=root)
+            categories.append(child)
+            categories.extend(Category(name=f'tree{t}-{c}-{gc}', user=user, parent=child) for gc in range(children))
+    db.session.add_all(categories)
+    db.session.flush()
+    return categories
+
+def seed_insert_gidguds(user: User, categories: list[Category], gids: int, recurring: int, guds: int, start: datetime, rng: random.Random) -> list[int]:
+    """
+    Bulk insert open, recurring and completed one-off gidguds of a user.
+
+    Returns:
+        list[int]: The IDs of the recurring gids.
+    """
+    span = (datetime.now(utc) - start).total_seconds()
+    rows = []
+    for n in range(gids + recurring + guds):
+        timestamp = start + timedelta(seconds=rng.uniform(0, span))
+        row = {
+            'body': f'{user.username} task {n}',
+            'timestamp': timestamp,
+            'user_id': user.id,
+            'recurrence_rhythm': 0,
+            'time_unit': None,
+            'next_occurrence': None,
+            'amount': rng.randint(1, 5),
+            'times': 1,
+            'completed': None,
+            'archived': False,
+            'category_id': rng.choice(categories).id,
+        }
+        if gids <= n < gids + recurring:
+            row['recurrence_rhythm'] = rng.randint(1, 3)
+            row['time_unit'] = rng.choice(SEED_TIME_UNITS)
+            # about half of them are waiting for their next occurrence
+            if rng.random() < 0.5:
+                row['next_occurrence'] = datetime.now(utc) + timedelta(hours=rng.uniform(1, 72))
+        elif n >= gids + recurring:
+            row['completed'] = timestamp + timedelta(hours=rng.uniform(0, 48))
+        rows.append(row)
+    db.session.execute(sa.insert(GidGud), rows)
+
+    return db.session.scalars(
+        sa.select(GidGud.id).where((GidGud.user_id == user.id) & (GidGud.recurrence_rhythm > 0))
+    ).all()
+
+def seed_insert_completions(user: User, recurring_ids: list[int], start: datetime, per_day: float, rng: random.Random) -> int:
+    """
+    Bulk insert a completion history for the recurring gids of a user, on average `per_day` completions a day.
+
+    Completed one-off gidguds get their single completion as well.
+
+    Returns:
+        int: The number of completions inserted.
+    """
+    rows = []
+    days = (datetime.now(utc) - start).days
+    if recurring_ids:
+        for day in range(days):
+            midnight = start + timedelta(days=day)
+            for _ in range(int(rng.expovariate(1 / per_day)) if per_day else 0):
+                rows.append({
+                    'gidgud_id': rng.choice(recurring_ids),
+                    'completed_at': midnight + timedelta(seconds=rng.uniform(0, 86400)),
+                    'amount': rng.randint(1, 5),
+                })
+    if rows:
+        db.session.execute(sa.insert(Completion), rows)
+
+    guds = db.session.execute(
+        sa.insert(Completion).from_select(
+            ['gidgud_id', 'completed_at', 'amount'],
+            sa.select(GidGud.id, GidGud.completed, GidGud.amount)
+            .where((GidGud.user_id == user.id) & GidGud.completed.isnot(None))
+        )
+    )
+    return len(rows) + guds.rowcount
+
+def seed_database(users: int, trees: int, children: int, gids: int, recurring: int, guds: int,
+                  years: float, per_day: float, prefix: str = 'seed', seed: int = 0) -> dict:
+    """
+    Create synthetic users with categories, gidguds and completions and commit them.
+
+    Users are named <prefix><n> with the password SEED_PASSWORD, existing names are skipped.
+
+    Returns:
+        dict: The numbers of users, categories, gidguds and completions created.
+    """
+    rng = random.Random(seed)
+    start = datetime.now(utc) - timedelta(days=365 * years)
+    created = {'users': 0, 'categories': 0, 'gidguds': 0, 'completions': 0}
+
+    for n in range(users):
+        username = f'{prefix}{n}'
+        if db.session.scalar(sa.select(User.id).where(User.username == username)):
+            continue
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password(SEED_PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+
+        categories = seed_create_categories(user, trees, children)
+        recurring_ids = seed_insert_gidguds(user, categories, gids, recurring, guds, start, rng)
+        created['completions'] += seed_insert_completions(user, recurring_ids, start, per_day, rng)
+        created['users'] += 1
+        created['categories'] += len(categories)
+        created['gidguds'] += gids + recurring + guds
+        db.session.commit()
+
+    # the bulk inserts bypassed the mapper events
+    category_counters_refresh()
+    rollup_refresh()
+    db.session.commit()
+    return created
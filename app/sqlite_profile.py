@@ -0,0 +1,39 @@
+# sqlite_profile.py
+
+import atexit
+import functools
+import sqlalchemy as sa
+from app import db
+
+# SQLite connection profile
+# ProductionConfig sets SQLITE_PRAGMAS, they are applied to every new pooled connection. In the default
+# rollback-journal mode readers wait for the writer, in WAL mode they read the last committed state next to it
+
+def sqlite_apply_pragmas(pragmas: dict, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+def sqlite_optimize(app):
+    """Let SQLite refresh the query planner statistics of tables whose indexes were used, see PRAGMA optimize."""
+    try:
+        with app.app_context():
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql('PRAGMA optimize')
+            db.engine.dispose()
+    except Exception as e:
+        app.logger.warning(f'PRAGMA optimize failed: {e}')
+
+def sqlite_profile_init_app(app):
+    """Apply SQLITE_PRAGMAS to the new connections of the app's engine and optimize at exit, for SQLite only."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+    if app.config['SQLITE_PRAGMAS']:
+        sa.event.listen(engine, 'connect', functools.partial(sqlite_apply_pragmas, app.config['SQLITE_PRAGMAS']))
+    if app.config['SQLITE_OPTIMIZE_ON_EXIT']:
+        atexit.register(sqlite_optimize, app)
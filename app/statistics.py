@@ -0,0 +1,138 @@
+# statistics.py
+
+from datetime import datetime
+from app.models import GidGud, Category, Completion, CompletionDaily
+from app import db
+from app.utils import gidgud_open_clause, gidgud_parse_feed_cursor, gidgud_sleeping_clause, gidgud_select_listing, gidgud_return_page
+from flask import current_app
+from sqlalchemy.orm import contains_eager
+import sqlalchemy as sa
+from pytz import utc
+
+# Statistics engine
+# counts are aggregated in the database, full lists are only loaded page by page on demand
+
+# states of live gidguds, counted with SUM(CASE ...)
+STATISTICS_STATES = {
+    'gids': gidgud_open_clause,
+    'sleep': gidgud_sleeping_clause,
+}
+
+# lists that can be shown on the statistics page, 'guds' lists the completion log
+STATISTICS_LISTS = ('gids', 'sleep', 'guds')
+
+def statistics_select_counts(user_id: int, now: datetime) -> sa.Select:
+    """
+    Build the grouped select counting the gidguds of a user per category and state.
+
+    Args:
+        user_id (int): The ID of the user whose gidguds are counted.
+        now (datetime): The point in time separating open from sleeping gids.
+
+    Returns:
+        sa.Select: One row per category with its id, name, one SUM(CASE ...) column per state
+                   and the number of completions as 'guds'.
+    """
+    state_counts = [
+        sa.func.sum(sa.case((clause(now), 1), else_=0)).label(state)
+        for state, clause in STATISTICS_STATES.items()
+    ]
+    # completions are summed from the daily rollup, about one row per active day instead of one per completion
+    completion_count = (
+        sa.select(sa.func.coalesce(sa.func.sum(CompletionDaily.count), 0))
+        .where((CompletionDaily.user_id == user_id) & (CompletionDaily.category_id == Category.id))
+        .scalar_subquery()
+        .label('guds')
+    )
+    return (
+        sa.select(Category.id, Category.name, *state_counts, completion_count)
+        .select_from(GidGud)
+        .join(Category, GidGud.category_id == Category.id)
+        .where(GidGud.user_id == user_id)
+        .group_by(Category.id, Category.name)
+        .order_by(Category.name)
+    )
+
+def statistics_return_counts(user_id: int, now: datetime | None = None) -> dict:
+    """
+    Count the open, sleeping and completed gidguds of a user per category in a single grouped query.
+
+    Args:
+        user_id (int): The ID of the user whose gidguds are counted.
+        now (datetime, optional): The point in time separating open from sleeping gids, defaults to now.
+
+    Returns:
+        dict: 'categories' holds one row per category with name and per state counts,
+              'totals' holds the per state counts over all categories.
+    """
+    now = now or datetime.now(utc)
+    categories = db.session.execute(statistics_select_counts(user_id, now)).all()
+
+    totals = {state: sum(getattr(row, state) for row in categories) for state in STATISTICS_LISTS}
+
+    return {'categories': categories, 'totals': totals}
+
+def completion_select_history(user_id: int, before: tuple | None = None) -> sa.Select:
+    """
+    Build the select for the completion log of a user, newest first.
+
+    Args:
+        user_id (int): The ID of the user whose completions are selected.
+        before (tuple, optional): Keyset cursor (completed_at, id) of the last row of the previous page.
+
+    Returns:
+        sa.Select: The select statement with the gidgud and its category eager loaded.
+    """
+    query = (
+        sa.select(Completion)
+        .join(Completion.gidgud)
+        .where(GidGud.user_id == user_id)
+        .options(contains_eager(Completion.gidgud).joinedload(GidGud.category))
+        .order_by(Completion.completed_at.desc(), Completion.id.desc())
+    )
+    if before is not None:
+        query = query.where(sa.tuple_(Completion.completed_at, Completion.id) < before)
+    return query
+
+def completion_return_page(user_id: int, cursor: str | None = None, per_page: int | None = None) -> tuple[list, str | None]:
+    """
+    Return one page of the completion log of a user using keyset pagination.
+
+    Args:
+        user_id (int): The ID of the user whose completions are listed.
+        cursor (str, optional): Keyset cursor of the previous page as taken from the URL.
+        per_page (int, optional): Page size, defaults to the GIDGUDS_PER_PAGE setting.
+
+    Returns:
+        tuple: The list of completions on this page and the cursor of the next page, or None if this is the last page.
+    """
+    per_page = per_page or current_app.config['GIDGUDS_PER_PAGE']
+    query = completion_select_history(user_id, gidgud_parse_feed_cursor(cursor)).limit(per_page + 1)
+    completions = db.session.scalars(query).all()
+
+    next_cursor = None
+    if len(completions) > per_page:
+        completions = completions[:per_page]
+        last = completions[-1]
+        next_cursor = f'{last.completed_at.isoformat()},{last.id}'
+
+    return completions, next_cursor
+
+def statistics_return_page(user_id: int, state: str, cursor: str | None = None, now: datetime | None = None) -> tuple[list, str | None]:
+    """
+    Return one page of the given statistics list of a user.
+
+    Args:
+        user_id (int): The ID of the user whose gidguds are listed.
+        state (str): One of STATISTICS_LISTS, 'guds' returns completions instead of gidguds.
+        cursor (str, optional): Keyset cursor of the previous page as taken from the URL.
+        now (datetime, optional): The point in time separating open from sleeping gids, defaults to now.
+
+    Returns:
+        tuple: The list of rows on this page and the cursor of the next page, or None if this is the last page.
+    """
+    if state == 'guds':
+        return completion_return_page(user_id, cursor)
+    now = now or datetime.now(utc)
+    query = gidgud_select_listing(user_id).where(STATISTICS_STATES[state](now))
+    return gidgud_return_page(query, cursor)
@@ -0,0 +1,172 @@
+# user_cache.py
+
+from collections import OrderedDict
+import threading
+import time
+from flask import current_app, g, has_app_context
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from werkzeug.utils import import_string
+from app import db
+from app.models import User
+
+# Cached user loader
+# flask-login loads the user on every request. The column values of recently loaded users are kept for
+# USER_CACHE_TTL seconds and every request gets its own detached, read-only User built from them, so no ORM
+# object is shared between sessions. Changes to a user delete its entry when they are committed. Other processes
+# using the in-process backend see a change after USER_CACHE_TTL at the latest, a shared backend sees it at once.
+# Cache keys and ETags must not lag behind, they read the version columns from the database with user_cache_return_versions
+
+# the password hash is never cached, reading it from a cached user fails like any unloaded attribute
+USER_CACHE_COLUMNS = [attribute.key for attribute in sa.inspect(User).column_attrs if attribute.key != 'password_hash']
+
+class TTLCacheBackend:
+    """
+    In-process cache holding at most USER_CACHE_SIZE entries for USER_CACHE_TTL seconds, least recently used first out.
+    """
+
+    def __init__(self, app):
+        self.max_entries = app.config['USER_CACHE_SIZE']
+        self.ttl = app.config['USER_CACHE_TTL']
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class UserCache:
+    """
+    Cache the column values of logged in users between requests.
+
+    The backend is created on first use from USER_CACHE_BACKEND, TTLCacheBackend if it is not set.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    backend_class = current_app.config['USER_CACHE_BACKEND'] or TTLCacheBackend
+                    if isinstance(backend_class, str):
+                        backend_class = import_string(backend_class)
+                    self._backend = backend_class(current_app._get_current_object())
+        return self._backend
+
+    def reset(self) -> None:
+        """Drop the backend and its entries, the next use builds a new one from the current config."""
+        with self._lock:
+            self._backend = None
+
+    def key(self, user_id: int) -> str:
+        return f'user:{user_id}'
+
+    def load(self, user_id: int) -> User | None:
+        """
+        Return a detached, read-only copy of a user, querying the database only on a cache miss.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User | None: The user, or None if it doesn't exist.
+        """
+        values = self.backend.get(self.key(user_id))
+        if values is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            values = {column: getattr(user, column) for column in USER_CACHE_COLUMNS}
+            self.backend.set(self.key(user_id), values)
+        return user_cache_return_detached(values)
+
+    def invalidate(self, *user_ids: int) -> None:
+        for user_id in user_ids:
+            self.backend.delete(self.key(user_id))
+        if has_app_context():
+            versions = g.get('user_versions', {})
+            for user_id in user_ids:
+                versions.pop(user_id, None)
+
+    def invalidate_on_commit(self, session, *user_ids: int) -> None:
+        """Delete the entries of the users when the session commits, a rollback keeps them."""
+        session.info.setdefault('user_cache_invalidate', set()).update(user_ids)
+
+
+user_cache = UserCache()
+
+def user_cache_return_versions(user_id: int) -> sa.Row:
+    """
+    Return data_version, data_modified and last_seen of a user from the database, read once per request.
+
+    The cached user may be USER_CACHE_TTL seconds behind a change made in another process, a fragment cache key
+    or ETag built from it would serve the old page.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        sa.Row: (data_version, data_modified, last_seen)
+    """
+    versions = g.setdefault('user_versions', {})
+    if user_id not in versions:
+        versions[user_id] = db.session.execute(
+            sa.select(User.data_version, User.data_modified, User.last_seen).where(User.id == user_id)
+        ).one()
+    return versions[user_id]
+
+def user_cache_return_detached(values: dict) -> User:
+    """Build a User that looks loaded from values but belongs to no session and refuses attribute changes."""
+    user = User(**values)
+    so.make_transient_to_detached(user)
+    sa.inspect(user).info['read_only'] = True
+    return user
+
+def user_cache_attribute_set(target, value, oldvalue, initiator):
+    if sa.inspect(target).info.get('read_only'):
+        raise AttributeError(f'{target!r} is a cached, read-only user, change db.session.get(User, id) instead')
+    session = so.object_session(target)
+    if session is not None and target.id is not None:
+        user_cache.invalidate_on_commit(session, target.id)
+
+for column in USER_CACHE_COLUMNS + ['password_hash']:
+    sa.event.listen(getattr(User, column), 'set', user_cache_attribute_set)
+
+@sa.event.listens_for(so.Session, 'after_commit')
+def user_cache_after_commit(session):
+    user_ids = session.info.pop('user_cache_invalidate', None)
+    if user_ids:
+        user_cache.invalidate(*user_ids)
+
+@sa.event.listens_for(so.Session, 'after_rollback')
+def user_cache_after_rollback(session):
+    session.info.pop('user_cache_invalidate', None)
@@ -2,20 +2,22 @@
 
 from datetime import datetime, timedelta, timezone
 import traceback
-from flask import flash, current_app, request
+from flask import flash, current_app, g, render_template, request
 from flask_login import current_user
-from app.models import User, GidGud, Category
+from app.models import User, GidGud, Category, Completion, user_bump_data_version
 from app import db
+from app.category_counters import category_counters_refresh
+from app.fragment_cache import fragment_cache
+from app.rollup import rollup_add_completion, rollup_refresh
+from app.scheduler import recurrence_scheduler
+from app.category_tree import MAX_CATEGORY_DEPTH, category_tree_return
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError, ProgrammingError, DatabaseError
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 import logging
 import sqlalchemy as sa
+import sqlalchemy.orm as so
 from pytz import utc
 
-# Define a function to generate ISO 8601 formatted strings
-def iso_now():
-    return datetime.now(utc).isoformat()
-
 # Utility Functions
 
 # General
@@ -99,6 +101,19 @@ def flash_warning_not_empty(name, collection):
     message = f"{name} has {collection}. Please reassign."
     return message
 
+def flash_after_commit(message):
+    """Flash a message once the session commits, a rollback drops it with the changes it reports."""
+    db.session.info.setdefault('flashes', []).append(message)
+
+@sa.event.listens_for(so.Session, 'after_commit')
+def flash_committed(session):
+    for message in session.info.pop('flashes', []):
+        flash(message)
+
+@sa.event.listens_for(so.Session, 'after_rollback')
+def flash_rolled_back(session):
+    session.info.pop('flashes', None)
+
 # User
 
 # User - check_and_return
@@ -114,8 +129,8 @@ def check_and_return_all_gidguds() -> list:
         list: A list of gidguds associated with the current user, or False if none exist.
     """
     try:
-        # Retrieve all gidguds associated with the current user
-        gidguds = current_user.gidguds
+        # Retrieve all gidguds associated with the current user, current_user is detached and can't lazy load
+        gidguds = db.session.scalars(sa.select(GidGud).where(GidGud.user_id == current_user.id)).all()
 
         # Return the list of gidguds if it exists, otherwise return False
         return gidguds if gidguds else False
@@ -132,8 +147,8 @@ def check_and_return_all_categories() -> list:
         list: A list of categories associated with the current user, or False if none exist.
     """
     try:
-        # Retrieve all categories associated with the current user
-        categories = current_user.categories
+        # Retrieve all categories associated with the current user, current_user is detached and can't lazy load
+        categories = db.session.scalars(sa.select(Category).where(Category.user_id == current_user.id)).all()
 
         # Return the list of categories if it exists, otherwise return False
         return categories if categories else False
@@ -193,49 +208,55 @@ def gidgud_return_dict_from_choice2(choice: list) -> dict:
         log_exception(e)
         return False
 
-def gidgud_return_dict_from_choice(choice: list) -> dict:
+def gidgud_open_clause(now: datetime):
+    """
+    Return the SQL predicate for open gids: not completed and not waiting for their next occurrence.
 
-    def check_sleep(gidgud):
-        datetime_now = datetime.now(utc)
-        gidgud_next_occurrence = datetime.fromisoformat(gidgud.next_occurrence)
-        sleep = (gidgud_next_occurrence - datetime_now).total_seconds()
-        return sleep
+    Args:
+        now (datetime): The point in time to compare next_occurrence against.
+    """
+    return GidGud.completed.is_(None) & (GidGud.next_occurrence.is_(None) | (GidGud.next_occurrence <= now))
+
+def gidgud_sleeping_clause(now: datetime):
+    """
+    Return the SQL predicate for sleeping gids: not completed and next_occurrence still in the future.
+
+    Args:
+        now (datetime): The point in time to compare next_occurrence against.
+    """
+    return GidGud.completed.is_(None) & (GidGud.next_occurrence > now)
+
+def gidgud_return_dict_from_choice(choice: list) -> dict:
 
     choices = ['gids', 'guds', 'sleep', 'all']
     gidgud_dict = {}
+    now = datetime.now(utc)
 
     try:
         if 'all' in choice:
-            gidguds = db.session.execute(sa.select(GidGud).where(current_user == GidGud.author)).scalars().all()
+            gidguds = db.session.execute(gidgud_select_listing(current_user.id)).scalars().all()
             gidgud_dict['all'] = gidguds
 
         if 'guds' in choice:
             guds = db.session.execute(
-                sa.select(GidGud)
-                .where((current_user == GidGud.author) & (GidGud.completed.isnot(None)))
+                gidgud_select_listing(current_user.id)
+                .where(GidGud.completed.isnot(None))
             ).scalars().all()
             gidgud_dict['guds'] = guds
 
-        if 'gids' in choice or 'sleep' in choice:
-            gids_and_sleep = db.session.scalars(
-                sa.select(GidGud)
-                .where((current_user == GidGud.author) & (GidGud.completed.is_(None)))
-            )
-            gids = []
-            sleep = []
-
-            for gidgud in gids_and_sleep:
-                if 'gids' in choice:
-                    if not gidgud.next_occurrence or (check_sleep(gidgud) <= 0):
-                        gids.append(gidgud)
-                if 'sleep' in choice:
-                    if gidgud.next_occurrence and check_sleep(gidgud) > 0:
-                        sleep.append(gidgud)
+        if 'gids' in choice:
+            gids = db.session.execute(
+                gidgud_select_listing(current_user.id)
+                .where(gidgud_open_clause(now))
+            ).scalars().all()
+            gidgud_dict['gids'] = gids
 
-            if 'gids' in choice:
-                gidgud_dict['gids'] = gids
-            if 'sleep' in choice:
-                gidgud_dict['sleep'] = sleep
+        if 'sleep' in choice:
+            sleep = db.session.execute(
+                gidgud_select_listing(current_user.id)
+                .where(gidgud_sleeping_clause(now))
+            ).scalars().all()
+            gidgud_dict['sleep'] = sleep
 
         return gidgud_dict
 
@@ -244,7 +265,115 @@ def gidgud_return_dict_from_choice(choice: list) -> dict:
         log_exception(e)
         return False
 
+def gidgud_select_listing(user_id: int) -> sa.Select:
+    """
+    Build the base select for gidgud listings rendered with _gidgud.html.
+
+    The category and author of every row are eager loaded, so rendering a page costs a fixed
+    number of queries instead of one lazy load per row and relationship.
+
+    Args:
+        user_id (int): The ID of the user whose gidguds are selected.
+
+    Returns:
+        sa.Select: The select statement with the eager loading options applied.
+    """
+    return (
+        sa.select(GidGud)
+        .where(GidGud.user_id == user_id)
+        .options(joinedload(GidGud.category), selectinload(GidGud.author))
+    )
+
+def gidgud_select_page(query: sa.Select, after: tuple | None = None) -> sa.Select:
+    """
+    Order a gidgud select by (timestamp, id) and continue it after a keyset cursor.
+
+    Args:
+        query (sa.Select): A select of GidGud rows, e.g. from gidgud_select_listing.
+        after (tuple, optional): Keyset cursor (timestamp, id) of the last row of the previous page.
+
+    Returns:
+        sa.Select: The ordered select statement.
+    """
+    query = query.order_by(GidGud.timestamp, GidGud.id)
+    if after is not None:
+        query = query.where(sa.tuple_(GidGud.timestamp, GidGud.id) > after)
+    return query
+
+def gidgud_parse_feed_cursor(cursor: str | None) -> tuple | None:
+    """
+    Parse a keyset cursor of the form '<timestamp>,<id>' from the URL.
+
+    Args:
+        cursor (str): The cursor taken from the request arguments.
+
+    Returns:
+        tuple or None: The (timestamp, id) tuple, or None if the cursor is missing or malformed.
+    """
+    if not cursor:
+        return None
+    timestamp, _, gidgud_id = cursor.rpartition(',')
+    if not timestamp or not gidgud_id.isdigit():
+        return None
+    try:
+        return datetime.fromisoformat(timestamp), int(gidgud_id)
+    except ValueError:
+        return None
+
+def gidgud_return_page(query: sa.Select, cursor: str | None = None, per_page: int | None = None) -> tuple[list, str | None]:
+    """
+    Return one page of a gidgud select using keyset pagination over (timestamp, id).
+
+    Args:
+        query (sa.Select): A select of GidGud rows, e.g. from gidgud_select_listing.
+        cursor (str, optional): Keyset cursor of the previous page as taken from the URL.
+        per_page (int, optional): Page size, defaults to the GIDGUDS_PER_PAGE setting.
+
+    Returns:
+        tuple: The list of gidguds on this page and the cursor of the next page, or None if this is the last page.
+    """
+    per_page = per_page or current_app.config['GIDGUDS_PER_PAGE']
+    query = gidgud_select_page(query, gidgud_parse_feed_cursor(cursor)).limit(per_page + 1)
+    gidguds = db.session.scalars(query).all()
+
+    next_cursor = None
+    if len(gidguds) > per_page:
+        gidguds = gidguds[:per_page]
+        last = gidguds[-1]
+        next_cursor = f'{last.timestamp.isoformat()},{last.id}'
+
+    return gidguds, next_cursor
+
+def gidgud_return_feed_page(cursor: str | None = None, per_page: int | None = None) -> tuple[list, str | None]:
+    """
+    Return one page of the current user's open gidguds using keyset pagination.
+
+    Args:
+        cursor (str, optional): Keyset cursor of the previous page as taken from the URL.
+        per_page (int, optional): Page size, defaults to the GIDGUDS_PER_PAGE setting.
+
+    Returns:
+        tuple: The list of gidguds on this page and the cursor of the next page, or None if this is the last page.
+    """
+    query = gidgud_select_listing(current_user.id).where(GidGud.completed.is_(None))
+    return gidgud_return_page(query, cursor, per_page)
+
+def gidgud_return_feed_html(cursor: str | None = None, paginate: bool = False):
+    """
+    Return the rendered feed page of the current user, from the fragment cache while the user's data is unchanged.
+
+    Args:
+        cursor (str, optional): Keyset cursor of the previous page as taken from the URL.
+        paginate (bool): Whether the fragment links to the next page.
 
+    Returns:
+        Markup: The rendered _gidgud_feed.html.
+    """
+    def render():
+        gidguds, next_cursor = gidgud_return_feed_page(cursor)
+        return render_template('_gidgud_feed.html', gidguds=gidguds, next_cursor=next_cursor if paginate else None)
+
+    return fragment_cache.render('feed', current_user, cursor, paginate, render=render)
 
 # GidGud - create_object
 # GidGud - handle_and_update_object
@@ -252,12 +381,14 @@ def gidgud_return_dict_from_choice(choice: list) -> dict:
 def gidgud_handle_update(gidgud, form):
 
     try:
+        old_category_id = gidgud.category_id
         gidgud.body = form.body.data
         if form.category.data is not gidgud.category.name:
             updated_category = check_if_category_exists_and_return(form.category.data)
             if not updated_category:
                 new_category = Category(name=form.category.data, user_id=current_user.id)
                 db.session.add(new_category)
+                category_remember(new_category)
                 gidgud.category = new_category
             else:
                 gidgud.category = updated_category
@@ -269,6 +400,11 @@ def gidgud_handle_update(gidgud, form):
             gidgud.time_unit = form.time_unit.data
             if gidgud.next_occurrence is not None:
                 gidgud.next_occurrence = None
+        db.session.flush()
+        if gidgud.category_id != old_category_id:
+            # the completions moved with the gidgud
+            rollup_refresh([old_category_id, gidgud.category_id])
+        user_bump_data_version(gidgud.user_id)
         db.session.commit()
         return True
 
@@ -278,19 +414,25 @@ def gidgud_handle_update(gidgud, form):
         return False
 
 def gidgud_handle_complete(current_gidgud):
+    # a gud stays completed once, like in bulk_complete_gidguds, another completion would inflate the statistics
+    if current_gidgud.completed is not None:
+        return False
     try:
-        timestamp = datetime.now(utc).isoformat()
+        timestamp = datetime.now(utc)
+        # every completion is appended to the narrow log, recurring gidguds are not cloned anymore
+        completion = Completion(gidgud=current_gidgud, completed_at=timestamp, amount=current_gidgud.amount)
+        db.session.add(completion)
+        user_bump_data_version(current_gidgud.user_id)
+        rollup_add_completion(completion)
         if current_gidgud.recurrence_rhythm == 0:
             current_gidgud.completed = timestamp
             db.session.commit()
             return True
         else:
-            gud = GidGud(body=current_gidgud.body, user_id=current_gidgud.user_id, category=current_gidgud.category, completed=timestamp)
             delta = timedelta(**{current_gidgud.time_unit: current_gidgud.recurrence_rhythm})
-            next_occurrence = datetime.fromisoformat(timestamp) + delta
-            current_gidgud.next_occurrence = next_occurrence.isoformat()
-            db.session.add(gud)
+            current_gidgud.next_occurrence = timestamp + delta
             db.session.commit()
+            recurrence_scheduler.schedule(current_gidgud.id, current_gidgud.next_occurrence)
             return True
     except Exception as e:
         # Log any exceptions that occur during the process
@@ -300,6 +442,52 @@ def gidgud_handle_complete(current_gidgud):
 # Category
 # Category - check_and_return
 
+def category_return_name_map() -> dict:
+    """
+    Return the request-scoped map of already looked up categories, keyed by (user_id, name).
+
+    Misses are stored as None, so every name costs at most one indexed query per request.
+
+    Returns:
+        dict: (user_id, name) -> Category or None
+    """
+    if 'category_by_name' not in g:
+        g.category_by_name = {}
+    return g.category_by_name
+
+def category_return_by_name(name: str, user_id: int | None = None) -> Category | None:
+    """
+    Look up a category of a user by name, using the (user_id, name) unique index.
+
+    Args:
+        name (str): The name of the category.
+        user_id (int, optional): The ID of the owning user, defaults to the current user.
+
+    Returns:
+        Category or None: The category, or None if the user has no category with this name.
+    """
+    user_id = user_id or current_user.id
+    categories = category_return_name_map()
+    key = (user_id, name)
+    if key not in categories:
+        categories[key] = db.session.scalar(
+            sa.select(Category).where((Category.user_id == user_id) & (Category.name == name))
+        )
+    return categories[key]
+
+def category_remember(category: Category, old_name: str | None = None) -> None:
+    """
+    Register a created or renamed category in the request-scoped name map.
+
+    Args:
+        category (Category): The category with its current name.
+        old_name (str, optional): The previous name of a renamed category.
+    """
+    categories = category_return_name_map()
+    if old_name is not None:
+        categories.pop((category.user_id, old_name), None)
+    categories[(category.user_id, category.name)] = category
+
 def check_if_category_exists_and_return(new_cat_name):
     """
     Check if a category with the given name exists for the current user and return the category object.
@@ -314,8 +502,8 @@ def check_if_category_exists_and_return(new_cat_name):
         # Ensure a default category name if None is provided
         new_cat_name = new_cat_name or 'default'
 
-        # Search for the category with the given name among the current user's categories
-        category = next((category for category in current_user.categories if category.name == new_cat_name), None)
+        # Indexed lookup of the category with the given name among the current user's categories
+        category = category_return_by_name(new_cat_name)
 
         # Return the category object if found, otherwise return False
         if category:
@@ -327,87 +515,117 @@ def check_if_category_exists_and_return(new_cat_name):
         log_exception(e)
         return False
 
-def check_and_return_list_of_possible_parents(current_category) -> list[str]:
+def category_return_edit_choices(node, tree) -> tuple[list[str], list[str], list[str]]:
     """
-    Return a list of potential parent categories for the given current_category,
-    adhering to a maximum of 3 category levels.
+    Return the choices of the edit category form, from one walk over the category tree.
+
+    Categories have at most 3 levels, so the possible parents of a category depend on its height:
+        - Case A: Categories with no children allow parents that have no grandparent (depth 0 or 1).
+        - Case B: Categories with children (but children have no children themselves) allow top level parents.
+        - Case C: Categories with children that have children do not allow parents.
+    The children of a category are moved together, so the child with the deepest subtree restricts them all.
+    The default category never becomes a parent.
 
     Args:
-        current_category (Category): The current category for which potential parents are to be determined.
+        node (CategoryNode): The node of the edited category.
+        tree (CategoryTree): The category tree of the user.
 
     Returns:
-        list[str]: A list of potential parent category names, including 'No Parent' option, or an empty list if no suitable parents are found.
-
-    Raises:
-        Exception: Any exception that occurs during the process is logged and an empty list is returned.
-
-    Notes:
-        - Case A: Categories with no children allow parents that have no parent (i.e., no grandparent).
-        - Case B: Categories with children (but children have no children themselves) allow parents with no parent.
-        - Case C: Categories with children that have children do not allow parents.
-
+        tuple[list[str], list[str], list[str]]: The parent choices, the gidgud reassignment choices and the
+        parent choices for the children, each starting with the entry that keeps the current state.
     """
-    try:
-        possible_parents = []
+    shallow, roots, others = [], [], []
+    for n in tree.walk():
+        if n is not node:
+            others.append(n.name)
+        if n.name == 'default':
+            continue
+        if n.depth <= 1:
+            shallow.append(n.name)
+        if n.depth == 0:
+            roots.append(n.name)
+
+    def possible_parents(n):
+        candidates = shallow if n.height == 0 else roots if n.height == 1 else []
+        return [name for name in candidates if name != n.name]
+
+    parent_choices = ['No Parent'] if node.parent is None else [node.parent.name, 'Remove Parent']
+    parent_choices += possible_parents(node)
+
+    gidgud_choices = ['No GidGuds'] if not node.category.gidgud_count else [node.name]
+    gidgud_choices += sorted(others)
+
+    if node.children:
+        highest_child = max(node.children, key=lambda child: child.height)
+        children_choices = [node.name, 'No Parent'] + [name for name in possible_parents(highest_child) if name != node.name]
+    else:
+        children_choices = ['No Children']
+
+    return parent_choices, gidgud_choices, children_choices
+
+def category_path_range(path: str) -> tuple[str, str]:
+    """
+    Return the [low, high) range of materialized paths inside the subtree rooted at path.
 
-        # Case A: Category has no children
-        if not current_category.children:
-            possible_parents = [category.name for category in current_user.categories if (category.parent is None or category.parent.parent is None) and category.name not in (current_category.name, 'default')]
+    Paths only contain digits and '/', so every descendant of '/1/4/' sorts between '/1/4/' and '/1/40'.
+    The range comparison runs on the path index, unlike LIKE 'prefix%'.
 
-        # Case B: Category has children, and the children do not have children
-        elif current_category.children and not any(category.children for category in current_category.children):
-            possible_parents = [category.name for category in current_user.categories if category.parent is None and category.name not in (current_category.name, 'default')]
+    Args:
+        path (str): The materialized path of the subtree root, e.g. '/1/4/'.
 
-        # Case C: Category has children with children
-        else:
-            # No suitable parents for categories with grandchildren
-            pass
+    Returns:
+        tuple[str, str]: The inclusive lower and exclusive upper bound.
+    """
+    return path, path[:-1] + '0'
 
-        return possible_parents
+def category_subtree_clause(category, include_self=True):
+    """
+    Return the SQL predicate selecting the categories in the subtree of a category.
 
-    except Exception as e:
-        # Log any exceptions that occur during the process
-        log_exception(e)
-        return []
+    Args:
+        category (Category): The root of the subtree.
+        include_self (bool): Whether the root itself matches.
+    """
+    low, high = category_path_range(category.path)
+    lower_bound = Category.path >= low if include_self else Category.path > low
+    return lower_bound & (Category.path < high)
 
-def check_and_return_list_of_possible_parents_for_children(current_category) -> list[str]:
+def category_return_subtree_height(category) -> int:
     """
-    Check and return the list of potential parent categories for the children of the given category.
+    Return the number of levels below a category with one indexed query.
 
     Args:
-        current_category (Category): The category whose children are to be considered.
+        category (Category): The root of the subtree.
 
     Returns:
-        list[str]: A list of potential parent categories for the children.
+        int: 0 for categories without children, 1 with children, 2 with grandchildren.
     """
-    try:
-        possible_parents = []
-        remove_parent = ['No Parent']
-
-        # Ensure eager loading of children to avoid N+1 query issue
-        current_category = Category.query.filter_by(id=current_category.id).options(selectinload(Category.children)).first()
-
-        # Check if any child category has children
-        if current_category.children:
-            # Check if any child category has its own children
-            first_child_with_grandchildren = next((category for category in current_category.children if category.children), None)
+    max_depth = db.session.scalar(sa.select(sa.func.max(Category.depth)).where(category_subtree_clause(category)))
+    return (max_depth if max_depth is not None else category.depth) - category.depth
 
-            if first_child_with_grandchildren:
-                # If a child category has grandchildren, determine potential parent categories recursively
-                possible_parents = check_and_return_list_of_possible_parents(first_child_with_grandchildren)
-            else:
-                # If no child category has grandchildren, determine potential parent categories for any child
-                possible_parents = check_and_return_list_of_possible_parents(current_category.children[0])
+def check_if_category_can_move(category, new_parent, children_only=False) -> bool:
+    """
+    Check if a category (or only its children) can be placed below new_parent without
+    exceeding 3 levels or creating a cycle.
 
-            possible_parents = [p for p in possible_parents if p != current_category.name]
-            possible_parents = remove_parent + possible_parents
+    The height is read from the materialized paths, so a check following an earlier move of the same
+    form submit sees the moved subtree.
 
-        return possible_parents
+    Args:
+        category (Category): The category to move, or whose children are moved.
+        new_parent (Category): The new parent, None for top level.
+        children_only (bool): Check moving the children of category instead of category itself.
 
-    except Exception as e:
-        # Log the exception with details
-        log_exception(f"An error occurred while checking possible parent categories for children: {str(e)}")
-        return []
+    Returns:
+        bool: True if the move is allowed.
+    """
+    if new_parent is None:
+        return True
+    # every descendant has the category's id in its path, also while its loaded path predates a move above it
+    if f'/{category.id}/' in new_parent.path:
+        return False
+    height = category_return_subtree_height(category) - (1 if children_only else 0)
+    return new_parent.depth + 1 + height <= MAX_CATEGORY_DEPTH
 
 # Category - create_object
 
@@ -424,14 +642,16 @@ def create_new_category(name: str, user_id: int) -> Category:
     """
     new_category = Category(name=name, user_id=user_id)
     db.session.add(new_category)
+    user_bump_data_version(user_id)
     db.session.commit()
+    category_remember(new_category)
     return new_category
 
 # Category - handle_and_update_object
 
 def category_handle_rename(current_category, form):
     """
-    Rename the current category based on user input.
+    Rename the current category based on user input. Does not commit.
 
     Args:
         current_category: The current category to be renamed.
@@ -441,15 +661,18 @@ def category_handle_rename(current_category, form):
         bool: True if the operation is successful, False otherwise.
     """
     try:
+        tree = category_tree_return(current_category.user_id)
         if current_category.name == 'default':
             flash('The default category may not be renamed.')
-        elif form.name.data in current_user.categories:
+        elif tree.named(form.name.data):
             flash('Category already exists. Please choose another name.')
         else:
+            old_name = current_category.name
             current_category.name = form.name.data
-            flash(f'Category {current_category.name} was renamed to {form.name.data}.')
-            db.session.commit()
+            flash_after_commit(f'Category {old_name} was renamed to {form.name.data}.')
+            category_remember(current_category, old_name)
             return True
+        return False
     except Exception as e:
         # Log any exceptions
         log_exception(e)
@@ -458,7 +681,7 @@ def category_handle_rename(current_category, form):
 
 def category_handle_change_parent(current_category, form):
     """
-    Change the parent category of the current category based on user input.
+    Change the parent category of the current category based on user input. Does not commit.
 
     Args:
         current_category: The current category whose parent will be changed.
@@ -470,29 +693,63 @@ def category_handle_change_parent(current_category, form):
 
     try:
         # Retrieve new parent category
-        new_parent_name = form.parent.data
-        new_parent = next((category for category in current_user.categories if category.name == new_parent_name), None)
+        tree = category_tree_return(current_category.user_id)
+        new_parent = tree.named(form.parent.data)
+
+        if not check_if_category_can_move(current_category, new_parent):
+            flash(f"{new_parent.name} can't become the parent of {current_category.name}, categories have at most 3 levels.")
+            return False
 
-        # Update parent
+        # Update parent and the materialized paths of the whole subtree
+        old_path = current_category.path
+        new_path = (new_parent.path if new_parent else '/') + f'{current_category.id}/'
+        depth_delta = (new_parent.depth + 1 if new_parent else 0) - current_category.depth
         current_category.parent = new_parent
+        category_handle_move_paths(old_path, new_path, depth_delta)
+        current_category.path = new_path
+        current_category.depth += depth_delta
 
         # Flash message
         if new_parent is None:
-            flash(f"Parent removed from category {current_category.name}.")
+            flash_after_commit(f"Parent removed from category {current_category.name}.")
         else:
-            flash(f"{new_parent.name} added as parent to category {current_category.name}.")
-
-        # Commit changes
-        db.session.commit()
+            flash_after_commit(f"{new_parent.name} added as parent to category {current_category.name}.")
         return True
     except Exception as e:
         # Log any exceptions
         log_exception(e)
         return False
 
+def category_handle_move_paths(old_prefix: str, new_prefix: str, depth_delta: int, include_root=True) -> int:
+    """
+    Rewrite the materialized paths and depths of a subtree after a parent change with one UPDATE.
+
+    Args:
+        old_prefix (str): The path prefix of the moved categories before the move.
+        new_prefix (str): The path prefix replacing it.
+        depth_delta (int): The change in depth of the moved categories.
+        include_root (bool): Whether the category at old_prefix itself is moved, or only its descendants.
+
+    Returns:
+        int: The number of categories updated.
+    """
+    low, high = category_path_range(old_prefix)
+    lower_bound = Category.path >= low if include_root else Category.path > low
+    result = db.session.execute(
+        sa.update(Category)
+        .where(lower_bound & (Category.path < high))
+        .values(
+            path=sa.literal(new_prefix) + sa.func.substr(Category.path, len(old_prefix) + 1),
+            depth=Category.depth + depth_delta
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount
+
 def category_child_protection_service(current_category, form):
     """
     Reassign children from the current category to a new parent category or remove them from their parent based on user input.
+    Does not commit.
 
     This function reassigns all categories belonging to the current category to a new parent category specified by the user through a form input. 
     If the specified new category is 'None', the categories are removed from their parent.
@@ -510,22 +767,29 @@ def category_child_protection_service(current_category, form):
 
         # Find the new parent category based on the provided name or set it to None if 'None' is specified
         if new_name == 'Remove Children':
-            new_parent_category_id = None
+            new_parent_category = None
         else:
-            new_parent_category_id = next((category.id for category in current_user.categories if category.name == new_name), None)
+            new_parent_category = category_tree_return(current_category.user_id).named(new_name)
+        new_parent_category_id = new_parent_category.id if new_parent_category else None
+
+        if not check_if_category_can_move(current_category, new_parent_category, children_only=True):
+            flash(f"Children of {current_category.name} can't be moved to {new_name}, categories have at most 3 levels.")
+            return False
 
         # Update the parent_id of categories belonging to the current category using a query update
         db.session.query(Category).filter(Category.parent_id == current_category.id).update(
             {Category.parent_id: new_parent_category_id}, synchronize_session=False)
 
-        # Commit the database transaction
-        db.session.commit()
+        # Move the materialized paths of all descendants below the new parent
+        new_prefix = new_parent_category.path if new_parent_category else '/'
+        depth_delta = (new_parent_category.depth if new_parent_category else -1) - current_category.depth
+        category_handle_move_paths(current_category.path, new_prefix, depth_delta, include_root=False)
 
         # Provide feedback to the user about the successful reassignment or removal
         if new_parent_category_id:
-            flash(f"Children reassigned to {new_name}")
+            flash_after_commit(f"Children reassigned to {new_name}")
         else:
-            flash("Children removed from parent.")
+            flash_after_commit("Children removed from parent.")
 
         return True
     except Exception as e:
@@ -535,7 +799,7 @@ def category_child_protection_service(current_category, form):
 
 def category_handle_reassign_gidguds(current_category, form):
     """
-    Reassign gidguds from the current category to a new category based on user input.
+    Reassign gidguds from the current category to a new category based on user input. Does not commit.
 
     This function reassigns all gidguds belonging to the current category to a new category specified by the user through a form input. 
     If the specified new category does not exist, the gidguds are reassigned to a default category.
@@ -552,18 +816,19 @@ def category_handle_reassign_gidguds(current_category, form):
         new_name = form.reassign_gidguds.data
 
         # Find the new category based on the provided name or default to a predefined default category
-        new_category = next((c for c in current_user.categories if c.name == new_name), Category.query.filter_by(name='default').first())
+        tree = category_tree_return(current_category.user_id)
+        new_category = tree.named(new_name) or tree.named('default')
 
         if new_category:
             # Update the category_id of gidguds belonging to the current category to the id of the new category
             db.session.query(GidGud).filter(GidGud.category_id == current_category.id).update(
                 {GidGud.category_id: new_category.id}, synchronize_session=False)
-
-            # Commit the database transaction
-            db.session.commit()
+            # the bulk update bypasses the mapper events maintaining the counters
+            category_counters_refresh([current_category.id, new_category.id])
+            rollup_refresh([current_category.id, new_category.id])
 
             # Provide feedback to the user about the successful reassignment
-            flash(f"GidGuds reassigned to {new_category.name}")
+            flash_after_commit(f"GidGuds reassigned to {new_category.name}")
             return True
         else:
             # Flash a message indicating that the specified parent category was not found
@@ -0,0 +1,62 @@
+"""
+Benchmark of the completion analytics engine.
+
+Generates N random completion timestamps spread over several years and times the reduction to days
+plus streaks, heatmap, weekday distribution and rolling totals.
+
+    python benchmarks/bench_analytics.py --completions 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from pytz import utc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analytics import SECONDS_PER_DAY, analytics_day_number, analytics_days_from_timestamps, analytics_summary
+
+
+def run(completions: int, years: int, repeat: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    now = datetime.now(utc)
+    end = int(now.timestamp())
+    timestamps = rng.integers(end - years * 365 * SECONDS_PER_DAY, end, size=completions, dtype=np.int64)
+    today = analytics_day_number(now.date())
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        days, counts = analytics_days_from_timestamps(timestamps)
+        summary = analytics_summary(days, counts, today)
+        timings.append(time.perf_counter() - started)
+
+    assert counts.sum() == completions
+    assert sum(summary['weekdays'].values()) == completions
+    return {
+        'completions': completions,
+        'active_days': int(days.size),
+        'best_seconds': min(timings),
+        'median_seconds': float(np.median(timings)),
+        'streaks': summary['streaks'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--completions', type=int, default=1_000_000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = run(args.completions, args.years, args.repeat, args.seed)
+    for key, value in result.items():
+        print(f'{key:16} {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Concurrency benchmark of the default and the production SQLite profile.
+
+Seeds one SQLite database, copies it once per profile and runs a worker process per profile in which several
+threads, each logged in as a different seeded user, mix reads (index, statistics) with writes (create_gid,
+complete_gidgud) through the Flask test client for a fixed time. Reports throughput, p50/p95 latency and failed
+requests per profile as JSON.
+
+    python benchmarks/bench_concurrency.py --threads 8 --seconds 10 --output results.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = ('default', 'production')
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def seed(users: int, years: float):
+    """Seed the database named by DATABASE_URL, run in its own process."""
+    from app import create_app, db
+    from app.seed import seed_database
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed_database(users=users, trees=3, children=2, gids=200, recurring=50, guds=500, years=years, per_day=5)
+
+
+def client_loop(app, username: str, deadline: float, write_ratio: float, seed: int, results: list):
+    """Issue requests as one user until the deadline, appending (kind, milliseconds, ok) to results."""
+    from app import db
+    from app.models import User, GidGud
+    from app.seed import SEED_PASSWORD
+    import sqlalchemy as sa
+
+    rng = random.Random(seed)
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': SEED_PASSWORD})
+    assert response.status_code == 302, response.status_code
+    with app.app_context():
+        user_id = db.session.scalar(sa.select(User.id).where(User.username == username))
+        gid_ids = db.session.scalars(
+            sa.select(GidGud.id).where((GidGud.user_id == user_id) & GidGud.completed.is_(None))
+        ).all()
+
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        if rng.random() < write_ratio:
+            kind = 'write'
+            if rng.random() < 0.5:
+                request = lambda: client.get(f'/complete_gidgud/{rng.choice(gid_ids)}')
+            else:
+                request = lambda: client.post('/create_gid', data={
+                    'body': f'bench gid {n}', 'category': 'default', 'rec_rhythm': 0, 'time_unit': '',
+                })
+        else:
+            kind = 'read'
+            if rng.random() < 0.5:
+                request = lambda: client.get('/index')
+            else:
+                request = lambda: client.get(f'/user/{username}/statistics')
+        started = time.perf_counter()
+        try:
+            ok = request().status_code < 400
+        except Exception:
+            ok = False
+        results.append((kind, (time.perf_counter() - started) * 1000, ok))
+
+
+def work(threads: int, seconds: float, write_ratio: float, seed: int) -> dict:
+    """Run the client threads against the profile selected by GIDGUD_CONFIG, run in its own process."""
+    from app import create_app
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, SLOW_REQUEST_MS=10 ** 9, SLOW_REQUEST_QUERIES=10 ** 9)
+    results = []
+    deadline = time.perf_counter() + seconds
+    workers = [
+        threading.Thread(target=client_loop, args=(app, f'seed{t}', deadline, write_ratio, seed + t, results))
+        for t in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    summary = {'requests_per_second': round(len(results) / elapsed, 1)}
+    for kind in ('read', 'write'):
+        latencies = [ms for k, ms, ok in results if k == kind]
+        summary[kind] = {
+            'requests': len(latencies),
+            'failed': sum(1 for k, ms, ok in results if k == kind and not ok),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+        }
+    return summary
+
+
+def run_process(mode: str, environment: dict, args) -> str:
+    command = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--threads', str(args.threads),
+               '--seconds', str(args.seconds), '--write-ratio', str(args.write_ratio), '--seed', str(args.seed),
+               '--years', str(args.years)]
+    # the scheduler thread would write next to the clients
+    base = {key: value for key, value in os.environ.items() if key != 'SCHEDULER_ENABLED'}
+    completed = subprocess.run(command, env={**base, **environment}, cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    return completed.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients, one seeded user each')
+    parser.add_argument('--seconds', type=float, default=10, help='duration per profile')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='share of requests that write')
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mode', choices=('compare', 'seed', 'work'), default='compare', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.mode == 'seed':
+        seed(args.threads, args.years)
+        return
+    if args.mode == 'work':
+        print(json.dumps(work(args.threads, args.seconds, args.write_ratio, args.seed)))
+        return
+
+    results = {'benchmark': 'concurrency', 'threads': args.threads, 'seconds': args.seconds,
+               'write_ratio': args.write_ratio, 'profiles': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        environment = {'LOG_DIR': directory}
+        seeded = os.path.join(directory, 'seeded.db')
+        run_process('seed', {**environment, 'DATABASE_URL': f'sqlite:///{seeded}'}, args)
+        for profile in PROFILES:
+            database = os.path.join(directory, f'{profile}.db')
+            shutil.copy(seeded, database)
+            output = run_process('work', {
+                **environment, 'DATABASE_URL': f'sqlite:///{database}', 'GIDGUD_CONFIG': profile,
+            }, args)
+            results['profiles'][profile] = json.loads(output.strip().splitlines()[-1])
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Route benchmark on a seeded database.
+
+Seeds a temporary SQLite database, logs in as a seeded user and drives index, statistics, edit_category,
+complete_gidgud and create_gid through the Flask test client. Reports p50/p95 latency and queries per
+request (taken from the Server-Timing header) as JSON.
+
+    python benchmarks/bench_routes.py --requests 200 --output results.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def setup(database: str, users: int, years: float):
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    from app import create_app, db
+    from app.seed import seed_database
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, SLOW_REQUEST_MS=10 ** 9, SLOW_REQUEST_QUERIES=10 ** 9)
+    with app.app_context():
+        db.create_all()
+        seed_database(users=users, trees=3, children=2, gids=200, recurring=50, guds=500, years=years, per_day=5)
+    return app
+
+
+def scenarios(app, username: str, rng: random.Random) -> dict:
+    """Return name -> callable(client) issuing one request of the scenario."""
+    from app import db
+    from app.models import User, GidGud, Category
+    import sqlalchemy as sa
+
+    with app.app_context():
+        user_id = db.session.scalar(sa.select(User.id).where(User.username == username))
+        category_ids = db.session.scalars(sa.select(Category.id).where(Category.user_id == user_id)).all()
+        gid_ids = db.session.scalars(
+            sa.select(GidGud.id).where((GidGud.user_id == user_id) & GidGud.completed.is_(None))
+        ).all()
+
+    counter = iter(range(10 ** 9))
+    return {
+        'index': lambda client: client.get('/index'),
+        'statistics': lambda client: client.get(f'/user/{username}/statistics'),
+        'edit_category': lambda client: client.get(f'/edit_category/{rng.choice(category_ids)}'),
+        'complete_gidgud': lambda client: client.get(f'/complete_gidgud/{rng.choice(gid_ids)}'),
+        'create_gid': lambda client: client.post('/create_gid', data={
+            'body': f'bench gid {next(counter)}', 'category': 'default', 'rec_rhythm': 0, 'time_unit': '',
+        }),
+    }
+
+
+def run(app, requests: int, seed: int) -> dict:
+    from app.seed import SEED_PASSWORD
+
+    rng = random.Random(seed)
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'seed0', 'password': SEED_PASSWORD})
+    assert response.status_code == 302, response.status_code
+
+    results = {}
+    for name, request in scenarios(app, 'seed0', rng).items():
+        latencies, queries = [], []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = request(client)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code in (200, 302), (name, response.status_code)
+            match = QUERIES_PATTERN.search(response.headers.get('Server-Timing', ''))
+            queries.append(int(match.group(1)) if match else 0)
+        results[name] = {
+            'requests': requests,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='requests per route')
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = setup(os.path.join(directory, 'bench.db'), args.users, args.years)
+        results = {'benchmark': 'routes', 'requests_per_route': args.requests, 'routes': run(app, args.requests, args.seed)}
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Startup-time benchmark.
+
+Starts fresh interpreters that import the app package, import gidgud.py (which calls create_app) and serve the first
+statistics request (which imports numpy), and reports p50/p95 wall time of each step as JSON. Also lists the modules
+with the largest cumulative import time of gidgud.py, taken from python -X importtime.
+
+    python benchmarks/bench_startup.py --runs 20 --output results.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = {
+    'import_app': 'import app',
+    'import_gidgud': 'import gidgud',
+    'first_statistics_request': (
+        'import gidgud\n'
+        'gidgud.app.config.update(TESTING=True)\n'
+        'client = gidgud.app.test_client()\n'
+        # logged in through the session, the password hash would dominate the timing
+        'with client.session_transaction() as session:\n'
+        '    session["_user_id"] = "1"\n'
+        'assert client.get("/user/bench/statistics").status_code == 200\n'
+    ),
+}
+
+# the database and the user the statistics request is made as, created once before the runs
+SETUP = (
+    'import gidgud\n'
+    'from app.models import User, Category\n'
+    'with gidgud.app.app_context():\n'
+    '    gidgud.db.create_all()\n'
+    '    user = User(id=1, username="bench", email="bench@example.com")\n'
+    '    gidgud.db.session.add_all([user, Category(name="default", user=user)])\n'
+    '    gidgud.db.session.commit()\n'
+)
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def time_step(code: str, environment: dict) -> float:
+    """Return the milliseconds a fresh interpreter needs to run code, measured inside it."""
+    timed = f'import time\nstarted = time.perf_counter()\n{code}\nprint((time.perf_counter() - started) * 1000)\n'
+    completed = subprocess.run([sys.executable, '-c', timed], env=environment, cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(environment: dict, top: int) -> list[dict]:
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import gidgud'], env=environment, cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        # only the modules gidgud.py and the app package import directly
+        if len(module) - len(module.lstrip()) <= 5:
+            imports.append({'module': module.strip(), 'cumulative_ms': round(int(cumulative_us) / 1000, 2)})
+    return sorted(imports, key=lambda entry: entry['cumulative_ms'], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='interpreter starts per step')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest imports to list')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = {'benchmark': 'startup', 'runs': args.runs, 'steps': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        environment = {**os.environ, 'DATABASE_URL': f'sqlite:///{os.path.join(directory, "startup.db")}',
+                       'LOG_DIR': directory}
+        environment.pop('SCHEDULER_ENABLED', None)
+        subprocess.run([sys.executable, '-c', SETUP], env=environment, cwd=ROOT, capture_output=True, check=True)
+        for name, code in STEPS.items():
+            timings = [time_step(code, environment) for _ in range(args.runs)]
+            results['steps'][name] = {
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+            }
+        results['slowest_imports'] = slowest_imports(environment, args.top)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
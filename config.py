@@ -14,4 +14,82 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS') is not None
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    ADMINS = ['your-email@example.com']
\ No newline at end of file
+    ADMINS = ['your-email@example.com']
+    GIDGUDS_PER_PAGE = int(os.environ.get('GIDGUDS_PER_PAGE') or 25)
+    # last_seen is only rewritten when older than the granularity, pending values are flushed every interval (seconds)
+    LAST_SEEN_GRANULARITY = int(os.environ.get('LAST_SEEN_GRANULARITY') or 60)
+    LAST_SEEN_FLUSH_INTERVAL = int(os.environ.get('LAST_SEEN_FLUSH_INTERVAL') or 30)
+    # background thread waking recurring gids when their next occurrence is due
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED') is not None
+    SCHEDULER_BATCH_SIZE = int(os.environ.get('SCHEDULER_BATCH_SIZE') or 500)
+    SCHEDULER_RESYNC_INTERVAL = int(os.environ.get('SCHEDULER_RESYNC_INTERVAL') or 300)
+    # rendered feed fragments, keyed by user and User.data_version. FRAGMENT_CACHE_BACKEND may name a class
+    # (import path) with get(key) and set(key, value), constructed with the app, to share the cache between processes
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE') or 1024)
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND')
+    # seconds for which time dependent pages (statistics) keep their ETag when the scheduler is off
+    CONDITIONAL_TIME_BUCKET = int(os.environ.get('CONDITIONAL_TIME_BUCKET') or 60)
+    # per-request SQL instrumentation: Server-Timing header, and a warning with the SQL for requests issuing
+    # more than SLOW_REQUEST_QUERIES statements or taking longer than SLOW_REQUEST_MS milliseconds
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') != '0'
+    SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES') or 20)
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS') or 500)
+    SLOW_REQUEST_MAX_STATEMENTS = int(os.environ.get('SLOW_REQUEST_MAX_STATEMENTS') or 50)
+    # requests over the query budget of their route fail instead of only being logged (see app/query_budget.py)
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') is not None
+    # logging: records are queued and written by a listener thread (see app/logging_pipeline.py)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_DIR = os.environ.get('LOG_DIR') or 'logs'
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT') or 10)
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+    LOG_JSON = os.environ.get('LOG_JSON') is not None
+    # identical error mails are sent once per window (seconds), at most MAIL_THROTTLE_LIMIT mails per window
+    MAIL_THROTTLE_WINDOW = int(os.environ.get('MAIL_THROTTLE_WINDOW') or 300)
+    MAIL_THROTTLE_LIMIT = int(os.environ.get('MAIL_THROTTLE_LIMIT') or 10)
+    # flask-login's user loader keeps the columns of recently seen users for USER_CACHE_TTL seconds.
+    # USER_CACHE_BACKEND may name a class with get(key), set(key, value) and delete(key), constructed with the app
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 10)
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND')
+    # items per request to the /api/gidguds/batch/* endpoints
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS') or 1000)
+    # SQLite connection pragmas and PRAGMA optimize at exit, set by ProductionConfig
+    SQLITE_PRAGMAS = {}
+    SQLITE_OPTIMIZE_ON_EXIT = False
+
+class ProductionConfig(Config):
+    # applied to every new SQLite connection (see app/sqlite_profile.py). WAL lets readers run next to the writer,
+    # synchronous=NORMAL is durable in WAL mode except for the last commits on power loss
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE') or 256 * 1024 * 1024),
+        # negative: KiB instead of pages
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_KIB') or 64 * 1024),
+        'temp_store': 'MEMORY',
+    }
+    # run PRAGMA optimize when the process exits, so the query planner statistics stay current
+    SQLITE_OPTIMIZE_ON_EXIT = True
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('SQLALCHEMY_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('SQLALCHEMY_MAX_OVERFLOW') or 10),
+        'pool_timeout': 10,
+        # SQLite connections don't go stale, but other databases behind DATABASE_URL do
+        'pool_pre_ping': not Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'),
+    }
+
+class TestingConfig(Config):
+    # an in-memory database, Flask-SQLAlchemy keeps it on one shared connection. No log files, no CSRF tokens
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    WTF_CSRF_ENABLED = False
+    SCHEDULER_ENABLED = False
+
+# selected with GIDGUD_CONFIG
+config = {
+    'default': Config,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
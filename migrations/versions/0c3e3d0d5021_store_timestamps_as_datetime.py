@@ -0,0 +1,119 @@
+"""store timestamps as datetime
+
+Revision ID: 0c3e3d0d5021
+Revises: 470e2c970707
+Create Date: 2026-10-18 06:22:23.413524
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c3e3d0d5021'
+down_revision = '470e2c970707'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# ISO strings written by the old iso_now() default and the DATETIME format SQLAlchemy uses on SQLite
+DATETIME_COLUMNS = {
+    'gid_gud': ['timestamp', 'next_occurrence', 'completed'],
+    'user': ['last_seen'],
+}
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def to_naive_utc(value):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime(SQLITE_DATETIME_FORMAT)
+
+
+def to_iso(value):
+    return datetime.strptime(value, SQLITE_DATETIME_FORMAT).replace(tzinfo=timezone.utc).isoformat()
+
+
+def convert_rows(table_name, columns, convert):
+    """Rewrite the given columns of a table in batches of BATCH_SIZE rows, walking the primary key."""
+    connection = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.Integer), *(sa.column(c, sa.String) for c in columns))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table).where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for column in columns:
+            updates = [
+                {'row_id': row.id, 'value': convert(getattr(row, column))}
+                for row in rows if getattr(row, column) is not None
+            ]
+            if updates:
+                connection.execute(
+                    table.update().where(table.c.id == sa.bindparam('row_id')).values({column: sa.bindparam('value')}),
+                    updates
+                )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    for table_name, columns in DATETIME_COLUMNS.items():
+        convert_rows(table_name, columns, to_naive_utc)
+
+    # Reflect the columns as DateTime already, otherwise the batch copy CASTs the
+    # converted strings with NUMERIC affinity and truncates them to the year
+    with op.batch_alter_table('gid_gud', schema=None, reflect_args=[
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('next_occurrence', sa.DateTime(), nullable=True),
+        sa.Column('completed', sa.DateTime(), nullable=True),
+    ]) as batch_op:
+        batch_op.alter_column('timestamp',
+               existing_type=sa.VARCHAR(),
+               type_=sa.DateTime(),
+               existing_nullable=False)
+        batch_op.alter_column('next_occurrence',
+               existing_type=sa.VARCHAR(),
+               type_=sa.DateTime(),
+               existing_nullable=True)
+        batch_op.alter_column('completed',
+               existing_type=sa.VARCHAR(),
+               type_=sa.DateTime(),
+               existing_nullable=True)
+
+    with op.batch_alter_table('user', schema=None, reflect_args=[
+        sa.Column('last_seen', sa.DateTime(), nullable=True),
+    ]) as batch_op:
+        batch_op.alter_column('last_seen',
+               existing_type=sa.VARCHAR(),
+               type_=sa.DateTime(),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('last_seen',
+               existing_type=sa.DateTime(),
+               type_=sa.VARCHAR(),
+               existing_nullable=True)
+
+    with op.batch_alter_table('gid_gud', schema=None) as batch_op:
+        batch_op.alter_column('completed',
+               existing_type=sa.DateTime(),
+               type_=sa.VARCHAR(),
+               existing_nullable=True)
+        batch_op.alter_column('next_occurrence',
+               existing_type=sa.DateTime(),
+               type_=sa.VARCHAR(),
+               existing_nullable=True)
+        batch_op.alter_column('timestamp',
+               existing_type=sa.DateTime(),
+               type_=sa.VARCHAR(),
+               existing_nullable=False)
+
+    for table_name, columns in DATETIME_COLUMNS.items():
+        convert_rows(table_name, columns, to_iso)
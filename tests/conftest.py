@@ -0,0 +1,29 @@
+import pytest
+from app import create_app, db
+from app.seed import SEED_PASSWORD, seed_database
+from config import TestingConfig
+
+# two users of very different size, a route whose statement count differs between them loads per row
+DATASETS = {
+    'small': dict(users=1, trees=1, children=1, gids=3, recurring=6, guds=3, years=0.1, per_day=1.0),
+    'large': dict(users=1, trees=3, children=2, gids=60, recurring=20, guds=100, years=1.0, per_day=3.0),
+}
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        for prefix, size in DATASETS.items():
+            seed_database(prefix=prefix, **size)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture(scope='session')
+def seeded_users() -> list[str]:
+    return [f'{prefix}0' for prefix in DATASETS]
+
+@pytest.fixture(scope='session')
+def password() -> str:
+    return SEED_PASSWORD
@@ -0,0 +1,96 @@
+import pytest
+import sqlalchemy as sa
+from app import db
+from app.category_counters import check_and_return_inconsistent_counters
+from app.models import Category, Completion, GidGud, User
+
+@pytest.fixture(scope='module')
+def user_id(app) -> int:
+    # a user of its own, the seeded users' data is measured by the budget tests
+    with app.app_context():
+        user = User(username='api', email='api@example.com')
+        db.session.add_all([user, Category(name='default', user=user)])
+        db.session.commit()
+        return user.id
+
+@pytest.fixture
+def client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    return client
+
+def create(client, *items) -> list[dict]:
+    response = client.post('/api/gidguds/batch/create', json={'items': list(items)})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['results']
+
+def test_create_returns_the_id_of_every_item_in_input_order(app, client):
+    results = create(
+        client,
+        {'body': 'first'},
+        {'body': ''},
+        {'body': 'second', 'category': 'api sport', 'recurrence_rhythm': 2, 'time_unit': 'days'},
+        {'body': 'third', 'completed': True},
+    )
+    assert [result['ok'] for result in results] == [True, False, True, True]
+    assert [result['index'] for result in results] == [0, 1, 2, 3]
+    with app.app_context():
+        bodies = {id: db.session.get(GidGud, id).body for id in (results[0]['id'], results[2]['id'], results[3]['id'])}
+        gud = db.session.get(GidGud, results[3]['id'])
+        assert bodies == {results[0]['id']: 'first', results[2]['id']: 'second', results[3]['id']: 'third'}
+        assert gud.completed is not None
+        assert db.session.scalar(sa.select(sa.func.count()).where(Completion.gidgud_id == gud.id)) == 1
+        assert db.session.get(GidGud, results[2]['id']).category.name == 'api sport'
+        assert check_and_return_inconsistent_counters() == []
+
+def test_complete_rejects_repeated_and_unknown_ids(app, client):
+    gid, recurring = (result['id'] for result in create(
+        client, {'body': 'once'}, {'body': 'daily', 'recurrence_rhythm': 1, 'time_unit': 'days'}
+    ))
+    response = client.post('/api/gidguds/batch/complete', json={'ids': [gid, recurring, recurring, gid, 0, 'x']})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [result.get('error') for result in payload['results']] == [
+        None, None, 'already completed', 'already completed', 'not found', 'not found'
+    ]
+    assert (payload['succeeded'], payload['failed']) == (2, 4)
+    with app.app_context():
+        assert db.session.get(GidGud, gid).completed is not None
+        assert db.session.get(GidGud, recurring).next_occurrence is not None
+        assert db.session.scalar(sa.select(sa.func.count()).where(Completion.gidgud_id == recurring)) == 1
+        assert check_and_return_inconsistent_counters() == []
+
+def test_delete_removes_the_gidguds_with_their_history(app, client):
+    gud, gid = (result['id'] for result in create(client, {'body': 'done', 'completed': True}, {'body': 'open'}))
+    response = client.post('/api/gidguds/batch/delete', json={'ids': [gud, gid, gud]})
+    assert [result['ok'] for result in response.get_json()['results']] == [True, True, False]
+    with app.app_context():
+        assert db.session.scalar(sa.select(sa.func.count()).where(GidGud.id.in_([gud, gid]))) == 0
+        assert db.session.scalar(sa.select(sa.func.count()).where(Completion.gidgud_id == gud)) == 0
+        assert check_and_return_inconsistent_counters() == []
+
+def test_other_users_gidguds_are_not_found(app, client):
+    with app.app_context():
+        foreign = db.session.scalar(sa.select(GidGud.id).join(GidGud.author).where(User.username != 'api').limit(1))
+    results = client.post('/api/gidguds/batch/delete', json={'ids': [foreign]}).get_json()['results']
+    assert results == [{'index': 0, 'ok': False, 'error': 'not found'}]
+
+@pytest.mark.parametrize('kwargs, status', [
+    ({'data': 'ids=1', 'content_type': 'application/x-www-form-urlencoded'}, 415),
+    ({'json': [1, 2]}, 400),
+    ({'json': {'ids': 1}}, 400),
+], ids=['form', 'list', 'not-a-list'])
+def test_unusable_batches_are_rejected(client, kwargs, status):
+    response = client.post('/api/gidguds/batch/complete', **kwargs)
+    assert response.status_code == status
+    assert response.get_json()['error']
+
+def test_batches_over_the_limit_get_413(app, client):
+    ids = list(range(app.config['BULK_MAX_ITEMS'] + 1))
+    response = client.post('/api/gidguds/batch/complete', json={'ids': ids})
+    assert response.status_code == 413
+
+def test_anonymous_requests_get_401(app):
+    response = app.test_client().post('/api/gidguds/batch/create', json={'items': []})
+    assert response.status_code == 401
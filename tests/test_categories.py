@@ -0,0 +1,76 @@
+import pytest
+import sqlalchemy as sa
+from app import db
+from app.models import Category, User
+from app.utils import check_if_category_can_move
+
+@pytest.fixture
+def categories(app) -> dict:
+    # a fresh user per test: a > b > c, and the top level categories d and e
+    with app.app_context():
+        number = db.session.scalar(sa.select(sa.func.count(User.id)))
+        user = User(username=f'categories{number}', email=f'categories{number}@example.com')
+        a = Category(name='a', user=user)
+        b = Category(name='b', user=user, parent=a)
+        c = Category(name='c', user=user, parent=b)
+        db.session.add_all([user, Category(name='default', user=user), a, b, c,
+                            Category(name='d', user=user), Category(name='e', user=user)])
+        db.session.commit()
+        return {'user_id': user.id, **{category.name: category.id for category in user.categories}}
+
+@pytest.fixture
+def client(app, categories):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(categories['user_id'])
+    return client
+
+def paths(app, categories) -> dict:
+    with app.app_context():
+        rows = db.session.execute(sa.select(Category.name, Category.path, Category.depth).where(Category.user_id == categories['user_id']))
+        return {name: (path, depth) for name, path, depth in rows}
+
+def test_moves_keep_three_levels_and_no_cycles(app, categories):
+    with app.app_context():
+        a, b, c, d = (db.session.get(Category, categories[name]) for name in 'abcd')
+        assert not check_if_category_can_move(a, c)
+        assert not check_if_category_can_move(d, c)
+        assert not check_if_category_can_move(a, d)
+        assert check_if_category_can_move(b, d)
+        assert check_if_category_can_move(c, d)
+        assert check_if_category_can_move(a, d, children_only=True)
+        assert check_if_category_can_move(c, None)
+
+def test_edit_category_moves_the_subtree_paths(app, client, categories):
+    response = client.post(f'/edit_category/{categories["b"]}', data={
+        'name': 'b', 'parent': 'Remove Parent', 'reassign_gidguds': 'No GidGuds', 'reassign_children': 'b',
+    })
+    assert response.status_code == 302
+    b, c = categories['b'], categories['c']
+    assert paths(app, categories)['b'] == (f'/{b}/', 0)
+    assert paths(app, categories)['c'] == (f'/{b}/{c}/', 1)
+
+def test_edit_category_moves_parent_and_children_in_one_submit(app, client, categories):
+    # b goes to the top level, its child c below d: the second path update runs on the already moved subtree
+    response = client.post(f'/edit_category/{categories["b"]}', data={
+        'name': 'b', 'parent': 'Remove Parent', 'reassign_gidguds': 'No GidGuds', 'reassign_children': 'd',
+    })
+    assert response.status_code == 302
+    b, c, d = (categories[name] for name in 'bcd')
+    assert paths(app, categories)['b'] == (f'/{b}/', 0)
+    assert paths(app, categories)['c'] == (f'/{d}/{c}/', 1)
+
+def test_delete_category_refuses_categories_with_children(app, client, categories):
+    response = client.post(f'/delete_category/{categories["b"]}')
+    assert '/edit_category/' in response.headers['Location']
+    response = client.post(f'/delete_category/{categories["c"]}')
+    assert response.status_code == 302
+    assert 'c' not in paths(app, categories)
+
+def test_delete_category_of_another_user_is_not_found(app, categories):
+    other = app.test_client()
+    with app.app_context():
+        other_id = db.session.scalar(sa.select(User.id).where(User.username == 'small0'))
+    with other.session_transaction() as session:
+        session['_user_id'] = str(other_id)
+    assert other.post(f'/delete_category/{categories["c"]}').status_code == 404
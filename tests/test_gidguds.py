@@ -0,0 +1,48 @@
+import pytest
+import sqlalchemy as sa
+from app import db
+from app.models import Category, Completion, CompletionDaily, GidGud, User
+
+@pytest.fixture
+def gid(app) -> dict:
+    # a fresh user per test with one open one-off gid
+    with app.app_context():
+        number = db.session.scalar(sa.select(sa.func.count(User.id)))
+        user = User(username=f'gidguds{number}', email=f'gidguds{number}@example.com')
+        category = Category(name='default', user=user)
+        gidgud = GidGud(body='done', author=user, category=category)
+        db.session.add_all([user, category, gidgud])
+        db.session.commit()
+        return {'user_id': user.id, 'id': gidgud.id}
+
+@pytest.fixture
+def client(app, gid):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(gid['user_id'])
+    return client
+
+def completions(app, gid) -> tuple[int, int]:
+    with app.app_context():
+        logged = db.session.scalar(sa.select(sa.func.count()).where(Completion.gidgud_id == gid['id']))
+        rolled_up = db.session.scalar(
+            sa.select(sa.func.coalesce(sa.func.sum(CompletionDaily.count), 0)).where(CompletionDaily.user_id == gid['user_id'])
+        )
+        return logged, rolled_up
+
+def test_completing_a_gud_again_adds_no_completion(app, client, gid):
+    client.post(f'/complete_gidgud/{gid["id"]}')
+    once = completions(app, gid)
+    client.post(f'/complete_gidgud/{gid["id"]}')
+    assert once[0] == 1
+    assert completions(app, gid) == once
+
+@pytest.mark.parametrize('action', ['delete_gidgud', 'complete_gidgud'])
+def test_unknown_and_foreign_gidguds_are_not_found(app, client, action):
+    with app.app_context():
+        foreign = db.session.scalar(sa.select(GidGud.id).join(GidGud.author).where(User.username == 'small0').limit(1))
+        missing = db.session.scalar(sa.select(sa.func.max(GidGud.id))) + 1
+    assert client.post(f'/{action}/{missing}').status_code == 404
+    assert client.post(f'/{action}/{foreign}').status_code == 404
+    with app.app_context():
+        assert db.session.get(GidGud, foreign) is not None
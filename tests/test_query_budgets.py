@@ -0,0 +1,29 @@
+import pytest
+from app import create_app
+from app.query_budget import query_budget_render_routes, query_budget_return_routes
+from config import TestingConfig
+
+ROUTES = query_budget_return_routes(create_app(TestingConfig))
+
+@pytest.fixture(scope='module')
+def renders(app, seeded_users, password) -> dict:
+    # username -> (endpoint, variant) -> render
+    return {
+        username: {
+            (render['endpoint'], tuple(render['variant'].items())): render
+            for render in query_budget_render_routes(app, username, password)
+        }
+        for username in seeded_users
+    }
+
+@pytest.mark.parametrize('endpoint, variant', ROUTES, ids=[f'{endpoint}{variant or ""}' for endpoint, variant in ROUTES])
+def test_route_within_query_budget(renders, endpoint, variant):
+    per_user = {username: routes[(endpoint, tuple(variant.items()))] for username, routes in renders.items()}
+    for username, render in per_user.items():
+        assert render['status'] < 400, f'{render["url"]} as {username}: HTTP {render["status"]}'
+        assert render['queries'] <= render['budget'], (
+            f'{render["url"]} as {username}: {render["queries"]}/{render["budget"]} statements\n'
+            + '\n'.join(sql for sql, parameters in render['statements'])
+        )
+    counts = {username: render['queries'] for username, render in per_user.items()}
+    assert len(set(counts.values())) == 1, f'statement count depends on the number of rows: {counts}'
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+import pytest
+import sqlalchemy as sa
+from pytz import utc
+from app import db
+from app.models import Category, CompletionDaily, User
+from app.rollup import UPSERT_INSERTS, rollup_add_completions
+
+@pytest.mark.parametrize('on_conflict', [True, False], ids=['on-conflict', 'fallback'])
+def test_rollup_adds_to_existing_rows_and_creates_missing_ones(app, monkeypatch, on_conflict):
+    if not on_conflict:
+        monkeypatch.delitem(UPSERT_INSERTS, 'sqlite')
+    with app.app_context():
+        user = User(username=f'rollup-{on_conflict}', email=f'rollup-{on_conflict}@example.com')
+        category = Category(name='default', user=user)
+        db.session.add_all([user, category])
+        db.session.flush()
+        today = datetime(2026, 5, 4, 12, tzinfo=utc)
+
+        def completion(at, amount=1):
+            return {'user_id': user.id, 'category_id': category.id, 'completed_at': at, 'amount': amount, 'times': 1}
+
+        rollup_add_completions([completion(today), completion(today, 2)])
+        rollup_add_completions([completion(today, 3), completion(today - timedelta(days=1))])
+        rows = db.session.execute(
+            sa.select(CompletionDaily.day, CompletionDaily.count, CompletionDaily.amount, CompletionDaily.times)
+            .where(CompletionDaily.user_id == user.id).order_by(CompletionDaily.day)
+        ).all()
+        db.session.rollback()
+    assert [tuple(row) for row in rows] == [(today.date() - timedelta(days=1), 1, 1, 1), (today.date(), 3, 6, 3)]
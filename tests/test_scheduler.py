@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta
+import time
+from pytz import utc
+from app.scheduler import RecurrenceScheduler
+
+def test_due_gids_do_not_postpone_the_resync(app, monkeypatch):
+    scheduler = RecurrenceScheduler()
+    monkeypatch.setitem(app.config, 'SCHEDULER_RESYNC_INTERVAL', 60)
+    scheduler._resynced_at = time.monotonic()
+    due = datetime.now(utc) - timedelta(seconds=1)
+
+    scheduler._heap = [(due, 1)]
+    assert scheduler._pop_due(app) == [1]
+
+    # a gid becomes due on every call, the resync still runs once its interval has passed since the last one
+    scheduler._resynced_at -= 60
+    scheduler._heap = [(due, 2)]
+    assert scheduler._pop_due(app) == []
+    assert scheduler._heap == [(due, 2)]